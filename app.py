@@ -1,9 +1,61 @@
+import importlib
+import os
+import threading
+
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
-# Removed executive_summary and client_feedback from imports
-from pages import agent_performance, lead_analysis, sales_revenue, market_trends, operational_efficiency
+
+from utils.warmup import request_finished, request_started, warm_up_callbacks
+
+# Route -> (page module, index of its nav link). Removed executive_summary and client_feedback
+PAGES = {
+    '/agent-performance': ('agent_performance', 0),
+    '/lead-analysis': ('lead_analysis', 1),
+    '/sales-revenue': ('sales_revenue', 2),
+    '/market-trends': ('market_trends', 3),
+    '/operational-efficiency': ('operational_efficiency', 4),
+}
+
+# Dash only picks up `dash.callback` registrations on its first request, so
+# pages with callbacks are imported up front. Their imports are cheap: data and
+# layouts are built on the first visit. Pages without callbacks are imported
+# lazily by load_page.
+CALLBACK_PAGES = ['lead_analysis', 'market_trends', 'operational_efficiency']
+for page_name in CALLBACK_PAGES:
+    importlib.import_module(f'pages.{page_name}')
+
+# Set PAGE_WARMUP=0 to skip building the remaining pages, and precomputing
+# common callback results, in the background
+PAGE_WARMUP = os.environ.get('PAGE_WARMUP', '1') != '0'
+
+_page_layouts = {}
+_page_locks = {name: threading.Lock() for name, _ in PAGES.values()}
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def load_page(name):
+    layout = _page_layouts.get(name)
+    if layout is None:
+        with _page_locks[name]:
+            layout = _page_layouts.get(name)
+            if layout is None:
+                module = importlib.import_module(f'pages.{name}')
+                layout = module.layout() if callable(module.layout) else module.layout
+                _page_layouts[name] = layout
+    return layout
+
+
+def warm_up_pages():
+    for name, _ in PAGES.values():
+        try:
+            load_page(name)
+        except Exception as e:
+            print(f"Failed to warm up page {name}: {e}")
+    # Then the default and most requested filter states, between live requests
+    warm_up_callbacks()
 
 # Initialize app with a modern theme
 app = dash.Dash(__name__, 
@@ -13,6 +65,25 @@ app = dash.Dash(__name__,
 )
 server = app.server
 
+
+@server.before_request
+def start_page_warmup():
+    # Runs on the first request, so warm-up only starts once the server is listening
+    global _warmup_started
+    request_started()
+    if PAGE_WARMUP and not _warmup_started:
+        # Concurrent first requests start one warm-up between them
+        with _warmup_lock:
+            if _warmup_started:
+                return
+            _warmup_started = True
+        threading.Thread(target=warm_up_pages, name='page-warmup', daemon=True).start()
+
+
+@server.teardown_request
+def finish_request(exc):
+    request_finished()
+
 # Modern futuristic color scheme matching agent_performance
 COLORS = {
     'primary': '#1A237E',    # Deep indigo
@@ -199,21 +270,11 @@ def display_page(pathname):
     
     styles = [base_style.copy() for _ in range(5)]
     
-    if pathname == '/agent-performance':
-        content = agent_performance.layout
-        styles[0] = active_style
-    elif pathname == '/lead-analysis':
-        content = lead_analysis.layout
-        styles[1] = active_style
-    elif pathname == '/sales-revenue':
-        content = sales_revenue.layout
-        styles[2] = active_style
-    elif pathname == '/market-trends':
-        content = market_trends.layout
-        styles[3] = active_style
-    elif pathname == '/operational-efficiency':
-        content = operational_efficiency.layout
-        styles[4] = active_style
+    if pathname in PAGES:
+        # Page modules and layouts are built on the first request to their route
+        page_name, nav_index = PAGES[pathname]
+        content = load_page(page_name)
+        styles[nav_index] = active_style
     elif pathname == '/':
         content = home_page
     else:
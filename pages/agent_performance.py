@@ -2,18 +2,12 @@ import dash
 from dash import html, dcc
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
 import dash_bootstrap_components as dbc
 import numpy as np
+from utils.datasets import get_dataset
 
-# Read the data from 'Agent_info.xlsx' - fixing escape sequence
-df_agents = pd.read_excel('./data/Agents Info.xlsx')
-
-# Data preprocessing
-df_agents.fillna(0, inplace=True)
-
-# Calculate conversion rate
-df_agents['Conversion Rate'] = (df_agents['Number of Prime TCRs'] + df_agents['Number of Resale TCRs']) / df_agents['Number of Leads Handled'] * 100
+# Shared agents data with conversion rate and total TCRs already derived
+df_agents = get_dataset('agents')
 
 # Calculate total and average metrics
 total_leads = df_agents['Number of Leads Handled'].sum()
@@ -168,7 +162,6 @@ fig_prime_resale_ratio.update_layout(
 )
 
 # Enhanced correlation visualization with trend line
-df_agents['Total_TCRs'] = df_agents['Number of Prime TCRs'] + df_agents['Number of Resale TCRs']
 fig_correlation = go.Figure()
 fig_correlation.add_trace(go.Scatter(
     x=df_agents['Number of Leads Handled'],
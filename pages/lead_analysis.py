@@ -2,23 +2,23 @@
 
 import dash
 from dash import html, dcc, callback, Output, Input, State, dash_table
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
 import dash_bootstrap_components as dbc
-
-# Read the data from 'Leads_Info.xlsx'
-df_leads = pd.read_excel('./data/Leads_Info.xlsx')
-
-# Strip spaces from column names
-df_leads.columns = df_leads.columns.str.strip()
-
-# Data Preprocessing
-df_leads['Creation Date'] = pd.to_datetime(df_leads['Creation Date'], errors='coerce')
-df_leads['Request Date'] = pd.to_datetime(df_leads['Request Date'], errors='coerce')
-df_leads['Budget From'] = pd.to_numeric(df_leads['Budget From'], errors='coerce')
-df_leads['Budget To'] = pd.to_numeric(df_leads['Budget To'], errors='coerce')
-df_leads.fillna({'Budget From': 0, 'Budget To': 0}, inplace=True)
+from functools import lru_cache
+from utils.bitmaps import BitmapIndex
+from utils.datasets import get_dataset
+from utils.date_index import DateIndex
+from utils.figure_cache import memoize_callback
+from utils.figure_patch import patch_figures
+from utils.frame_view import FrameView
+from utils.lead_cube import CUBE_COLUMNS, LeadCube
+from utils.ngram_index import TrigramIndex
+from utils.single_flight import SINGLE_FLIGHT, coalesce_callback
+from utils.table_query import filter_view, parse_filter_query, sort_view
+from utils.warmup import warm_callback
 
 # Theme colors matching agent_performance
 theme_colors = {
@@ -56,350 +56,342 @@ chart_template = {
     }
 }
 
-# Calculate KPIs
-total_leads = len(df_leads)
-leads_by_status = df_leads['Lead Status'].value_counts()
-leads_by_source = df_leads['Lead Source'].value_counts().reset_index()
-leads_by_source.columns = ['Lead Source', 'count']
-average_budget_from = df_leads['Budget From'].mean()
-average_budget_to = df_leads['Budget To'].mean()
-
-# Prepare data for initial charts
-# Sunburst Chart
-sunburst_data = df_leads.groupby(['Lead Source', 'Lead Status']).size().reset_index(name='count')
-fig_sunburst = px.sunburst(
-    sunburst_data,
-    path=['Lead Source', 'Lead Status'],
-    values='count',
-    title='Lead Source and Status Breakdown'
-)
-fig_sunburst.update_layout(template=chart_template)
-
-# Heatmap Chart (Budget vs. Property Type)
-heatmap_data = df_leads.pivot_table(
-    index='Property Type',
-    columns='Lead Status',
-    values='Budget From',
-    aggfunc='mean'
-)
-fig_heatmap = px.imshow(
-    heatmap_data,
-    labels=dict(x="Lead Status", y="Property Type", color="Average Budget"),
-    title="Average Budget Heatmap"
-)
-fig_heatmap.update_layout(template=chart_template)
-
-# Bubble Chart (Budget vs. Property Type)
-bubble_data = df_leads.copy()
-bubble_data['Budget Average'] = (bubble_data['Budget From'] + bubble_data['Budget To']) / 2
-fig_bubble = px.scatter(
-    bubble_data,
-    x='Budget Average',
-    y='Property Type',
-    size='Budget Average',
-    color='Lead Status',
-    hover_name='Lead Name',
-    title='Budget vs. Property Type Bubble Chart'
-)
-fig_bubble.update_layout(template=chart_template)
-
-# Treemap Chart (Leads by District and Property Type)
-treemap_data = df_leads.groupby(['District Name', 'Property Type']).size().reset_index(name='count')
-fig_treemap = px.treemap(
-    treemap_data,
-    path=['District Name', 'Property Type'],
-    values='count',
-    title='Leads Distribution Treemap'
-)
-fig_treemap.update_layout(template=chart_template)
-
-# Funnel Chart (Lead Conversion Funnel)
-funnel_stages = df_leads['Lead Status'].value_counts().reset_index()
-funnel_stages.columns = ['Stage', 'Number of Leads']
-fig_funnel = go.Figure(go.Funnel(
-    y=funnel_stages['Stage'],
-    x=funnel_stages['Number of Leads'],
-    textinfo="value+percent initial"
-))
-fig_funnel.update_layout(template=chart_template, title='Lead Conversion Funnel')
-
-# Calendar Heatmap (Leads per Day)
-heatmap_counts = df_leads.copy()
-heatmap_counts['Date'] = heatmap_counts['Creation Date'].dt.date
-heatmap_counts = heatmap_counts.groupby('Date').size().reset_index(name='Leads')
-fig_calendar_heatmap = px.density_heatmap(
-    heatmap_counts,
-    x='Date',
-    y='Leads',
-    nbinsx=30,
-    title='Leads per Day Heatmap'
-)
-fig_calendar_heatmap.update_layout(template=chart_template)
+# Lead counts and budget sums per (source, status, district, property type,
+# day) cell, built once; the aggregate charts are answered from it
+@lru_cache(maxsize=None)
+def load_lead_cube():
+    return LeadCube(get_dataset('leads'))
 
-# Define the layout variable
-layout = dbc.Container([
-    html.H1("Lead Analysis Dashboard", 
-            className="text-center my-4", 
-            style={'color': theme_colors['accent1'], 'font-family': 'Roboto', 'font-weight': '300'}),
+# Bitsets of the leads holding each categorical value, for the filters
+@lru_cache(maxsize=None)
+def load_lead_index():
+    return BitmapIndex(get_dataset('leads'), ['Lead Status', 'Lead Source', 'District Name', 'Property Type'])
+
+# Leads sorted by creation day, for the date range
+@lru_cache(maxsize=None)
+def load_lead_dates():
+    return DateIndex(get_dataset('leads')['Creation Date'], days=True)
+
+# Trigram posting lists over the lead names, for the search box
+@lru_cache(maxsize=None)
+def load_name_index():
+    return TrigramIndex(get_dataset('leads')['Lead Name'])
+
+# Columns of the bubble chart and of the data table (the source columns,
+# without ones derived at load)
+BUBBLE_COLUMNS = ['Budget Average', 'Property Type', 'Lead Status', 'Lead Name']
+DERIVED_COLUMNS = ['Budget Average']
+
+def table_columns(df_leads):
+    return [column for column in df_leads.columns if column not in DERIVED_COLUMNS]
+
+# Data and KPIs are built on the first visit to the page, so importing this
+# module (and registering its callbacks) stays cheap; the figures are filled
+# in by their callbacks
+def layout():
+    df_leads = get_dataset('leads')
+
+    # Calculate KPIs
+    total_leads = len(df_leads)
+    leads_by_status = df_leads['Lead Status'].value_counts()
+    leads_by_source = df_leads['Lead Source'].value_counts().reset_index()
+    leads_by_source.columns = ['Lead Source', 'count']
+    average_budget_from = df_leads['Budget From'].mean()
+    average_budget_to = df_leads['Budget To'].mean()
+
+    # Define the layout
+    return dbc.Container([
+        html.H1("Lead Analysis Dashboard", 
+                className="text-center my-4", 
+                style={'color': theme_colors['accent1'], 'font-family': 'Roboto', 'font-weight': '300'}),
     
-    # Tabs with futuristic styling
-    dbc.Tabs([
-        dbc.Tab(label='Overview', children=[
-            # KPIs Row
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H3(f"{total_leads:,}", 
-                                   className="text-center", 
-                                   style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
-                            html.P("Total Leads", 
-                                  className="text-center mb-0",
-                                  style={'color': theme_colors['text']})
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
-                ], width=12, md=3, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H3(f"${average_budget_from:,.0f} - ${average_budget_to:,.0f}", 
-                                   className="text-center", 
-                                   style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
-                            html.P("Average Budget Range", 
-                                  className="text-center mb-0",
-                                  style={'color': theme_colors['text']})
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
-                ], width=12, md=3, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H3(f"{leads_by_status.idxmax()}", 
-                                   className="text-center", 
-                                   style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
-                            html.P("Most Common Lead Status", 
-                                  className="text-center mb-0",
-                                  style={'color': theme_colors['text']})
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
-                ], width=12, md=3, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H3(f"{leads_by_source.iloc[0]['Lead Source']}", 
-                                   className="text-center", 
-                                   style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
-                            html.P("Top Lead Source", 
-                                  className="text-center mb-0",
-                                  style={'color': theme_colors['text']})
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
-                ], width=12, md=3, className="mb-4"),
-            ]),
+        # Tabs with futuristic styling
+        dbc.Tabs(id='lead-tabs', active_tab='overview', children=[
+            dbc.Tab(label='Overview', tab_id='overview', children=[
+                # KPIs Row
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H3(f"{total_leads:,}", 
+                                       className="text-center", 
+                                       style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
+                                html.P("Total Leads", 
+                                      className="text-center mb-0",
+                                      style={'color': theme_colors['text']})
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
+                    ], width=12, md=3, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H3(f"${average_budget_from:,.0f} - ${average_budget_to:,.0f}", 
+                                       className="text-center", 
+                                       style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
+                                html.P("Average Budget Range", 
+                                      className="text-center mb-0",
+                                      style={'color': theme_colors['text']})
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
+                    ], width=12, md=3, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H3(f"{leads_by_status.idxmax()}", 
+                                       className="text-center", 
+                                       style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
+                                html.P("Most Common Lead Status", 
+                                      className="text-center mb-0",
+                                      style={'color': theme_colors['text']})
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
+                    ], width=12, md=3, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H3(f"{leads_by_source.iloc[0]['Lead Source']}", 
+                                       className="text-center", 
+                                       style={'color': theme_colors['accent1'], 'font-size': '2.5rem'}),
+                                html.P("Top Lead Source", 
+                                      className="text-center mb-0",
+                                      style={'color': theme_colors['text']})
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'})
+                    ], width=12, md=3, className="mb-4"),
+                ]),
             
-            # Filters Card
-            dbc.Card([
-                dbc.CardBody([
-                    dbc.Row([
-                        dbc.Col([
-                            html.Label('Filter by Lead Status:', 
-                                     className="mb-2",
-                                     style={'color': theme_colors['text']}),
-                            dcc.Dropdown(
-                                options=[{'label': status, 'value': status} for status in df_leads['Lead Status'].unique()],
-                                value=[],
-                                multi=True,
-                                id='status-filter',
-                                style={'background': theme_colors['card_bg']}
-                            )
-                        ], md=4),
-                        dbc.Col([
-                            html.Label('Filter by Lead Source:', 
-                                     className="mb-2",
-                                     style={'color': theme_colors['text']}),
-                            dcc.Dropdown(
-                                options=[{'label': source, 'value': source} for source in df_leads['Lead Source'].unique()],
-                                value=[],
-                                multi=True,
-                                id='source-filter',
-                                style={'background': theme_colors['card_bg']}
-                            )
-                        ], md=4),
-                        dbc.Col([
-                            html.Label('Select Date Range:', 
-                                     className="mb-2",
-                                     style={'color': theme_colors['text']}),
-                            dcc.DatePickerRange(
-                                id='date-picker-range',
-                                start_date=df_leads['Creation Date'].min(),
-                                end_date=df_leads['Creation Date'].max(),
-                                display_format='Y-MM-DD'
-                            )
-                        ], md=4),
+                # Filters Card
+                dbc.Card([
+                    dbc.CardBody([
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label('Filter by Lead Status:', 
+                                         className="mb-2",
+                                         style={'color': theme_colors['text']}),
+                                dcc.Dropdown(
+                                    options=[{'label': status, 'value': status} for status in df_leads['Lead Status'].unique()],
+                                    value=[],
+                                    multi=True,
+                                    id='status-filter',
+                                    style={'background': theme_colors['card_bg']}
+                                )
+                            ], md=4),
+                            dbc.Col([
+                                html.Label('Filter by Lead Source:', 
+                                         className="mb-2",
+                                         style={'color': theme_colors['text']}),
+                                dcc.Dropdown(
+                                    options=[{'label': source, 'value': source} for source in df_leads['Lead Source'].unique()],
+                                    value=[],
+                                    multi=True,
+                                    id='source-filter',
+                                    style={'background': theme_colors['card_bg']}
+                                )
+                            ], md=4),
+                            dbc.Col([
+                                html.Label('Select Date Range:', 
+                                         className="mb-2",
+                                         style={'color': theme_colors['text']}),
+                                dcc.DatePickerRange(
+                                    id='date-picker-range',
+                                    start_date=df_leads['Creation Date'].min(),
+                                    end_date=df_leads['Creation Date'].max(),
+                                    display_format='Y-MM-DD'
+                                )
+                            ], md=4),
+                        ])
                     ])
-                ])
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}', 'margin-bottom': '2rem'}),
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}', 'margin-bottom': '2rem'}),
             
-            # Charts
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='sunburst-chart', figure=fig_sunburst)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='heatmap-chart', figure=fig_heatmap)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
+                # Charts
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='sunburst-chart')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='heatmap-chart')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                ]),
             ]),
-        ]),
         
-        dbc.Tab(label='Detailed Analysis', children=[
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='bubble-chart', figure=fig_bubble)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='treemap-chart', figure=fig_treemap)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
-            ]),
+            dbc.Tab(label='Detailed Analysis', tab_id='detailed', children=[
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='bubble-chart')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='treemap-chart')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                ]),
             
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='funnel-chart', figure=fig_funnel)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='calendar-heatmap', figure=fig_calendar_heatmap)
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-                ], width=12, lg=6, className="mb-4"),
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='funnel-chart')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='calendar-heatmap')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+                    ], width=12, lg=6, className="mb-4"),
+                ]),
             ]),
-        ]),
         
-        dbc.Tab(label='Data Table', children=[
-            dbc.Card([
-                dbc.CardBody([
-                    html.H3("Leads Data Table", 
-                           className="mb-4", 
-                           style={'color': theme_colors['accent1']}),
-                    dbc.Input(
-                        id="search-input",
-                        type="text", 
-                        placeholder="Search leads...",
-                        className="mb-3",
-                        style={'background': theme_colors['card_bg'], 'color': theme_colors['text']}
-                    ),
-                    dash_table.DataTable(
-                        id='data-table',
-                        columns=[{"name": i, "id": i} for i in df_leads.columns],
-                        data=df_leads.to_dict('records'),
-                        style_table={'overflowX': 'auto'},
-                        style_header={
-                            'backgroundColor': theme_colors['primary'],
-                            'color': theme_colors['text'],
-                            'fontWeight': 'bold',
-                            'textAlign': 'center',
-                            'padding': '12px'
-                        },
-                        style_cell={
-                            'backgroundColor': theme_colors['card_bg'],
-                            'color': theme_colors['text'],
-                            'textAlign': 'left',
-                            'padding': '12px',
-                            'fontSize': '14px'
-                        },
-                        style_data_conditional=[{
-                            'if': {'row_index': 'odd'},
-                            'backgroundColor': theme_colors['background']
-                        }],
-                        page_size=10,
-                        filter_action="native",
-                        sort_action="native",
-                        sort_mode="multi",
-                        page_action="native"
-                    )
-                ])
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
-        ])
-    ], className="mb-4")
-], fluid=True, style={'backgroundColor': theme_colors['background'], 'minHeight': '100vh', 'padding': '20px'})
-
-# Callback to update charts based on filters
-@callback(
-    Output('sunburst-chart', 'figure'),
-    Output('heatmap-chart', 'figure'),
-    Output('bubble-chart', 'figure'),
-    Output('treemap-chart', 'figure'),
-    Output('funnel-chart', 'figure'),
-    Output('calendar-heatmap', 'figure'),
-    Output('data-table', 'data'),
+            dbc.Tab(label='Data Table', tab_id='table', children=[
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H3("Leads Data Table", 
+                               className="mb-4", 
+                               style={'color': theme_colors['accent1']}),
+                        dbc.Input(
+                            id="search-input",
+                            type="text", 
+                            placeholder="Search leads...",
+                            # Search on Enter or when the box loses focus, not per keystroke
+                            debounce=True,
+                            className="mb-3",
+                            style={'background': theme_colors['card_bg'], 'color': theme_colors['text']}
+                        ),
+                        dash_table.DataTable(
+                            id='data-table',
+                            columns=[{"name": i, "id": i} for i in table_columns(df_leads)],
+                            data=[],
+                            style_table={'overflowX': 'auto'},
+                            style_header={
+                                'backgroundColor': theme_colors['primary'],
+                                'color': theme_colors['text'],
+                                'fontWeight': 'bold',
+                                'textAlign': 'center',
+                                'padding': '12px'
+                            },
+                            style_cell={
+                                'backgroundColor': theme_colors['card_bg'],
+                                'color': theme_colors['text'],
+                                'textAlign': 'left',
+                                'padding': '12px',
+                                'fontSize': '14px'
+                            },
+                            style_data_conditional=[{
+                                'if': {'row_index': 'odd'},
+                                'backgroundColor': theme_colors['background']
+                            }],
+                            page_current=0,
+                            page_size=10,
+                            page_count=1,
+                            filter_action="custom",
+                            filter_query='',
+                            sort_action="custom",
+                            sort_mode="multi",
+                            sort_by=[],
+                            page_action="custom"
+                        )
+                    ])
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'})
+            ])
+        ], className="mb-4")
+    ], fluid=True, style={'backgroundColor': theme_colors['background'], 'minHeight': '100vh', 'padding': '20px'})
+
+# Leads matching the page filters, as a view over the shared frame
+def filter_leads(selected_statuses, selected_sources, start_date, end_date, search_value):
+    df_leads = get_dataset('leads')
+    index = load_lead_index()
+    matches = index.select({'Lead Status': selected_statuses, 'Lead Source': selected_sources})
+    if start_date and end_date:
+        # Whole days, as in the lead cube: a slice of the sorted date index,
+        # narrowed to the rows set in the filter bitset
+        positions = load_lead_dates().positions(start_date, end_date)
+        positions = positions[index.test(matches, positions)]
+    else:
+        positions = index.positions(matches)
+    # Row positions over the shared frame; charts take only the columns they use
+    view = FrameView(df_leads, positions)
+    if search_value:
+        view = view.within(load_name_index().search(search_value))
+    return view
+
+# The filtered rows and cube aggregates for one filter state, shared by the
+# per-figure callbacks below so each state is filtered once
+@lru_cache(maxsize=32)
+def lead_selection(selected_statuses, selected_sources, start_date, end_date, search_value):
+    view = filter_leads(list(selected_statuses), list(selected_sources), start_date, end_date, search_value)
+
+    # Aggregates come from the cube; a name search is row-level, so its
+    # matches get a cube of their own
+    if search_value:
+        summary = LeadCube(view.frame(CUBE_COLUMNS)).query()
+    elif start_date and end_date:
+        summary = load_lead_cube().query(list(selected_statuses), list(selected_sources), start_date, end_date)
+    else:
+        summary = load_lead_cube().query(list(selected_statuses), list(selected_sources))
+    return view, summary
+
+def select_leads(selected_statuses, selected_sources, start_date, end_date, search_value):
+    # All the figure callbacks ask for the same state at once after a filter
+    # change; the first computes it and the rest wait for its result
+    args = (tuple(selected_statuses or ()), tuple(selected_sources or ()), start_date, end_date, search_value or None)
+    return SINGLE_FLIGHT.run(('lead_selection',) + args, lambda: lead_selection(*args))
+
+def default_filters():
+    # The filters as the layout first sends them
+    dates = get_dataset('leads')['Creation Date']
+    return [[], [], dates.min(), dates.max(), '']
+
+def default_overview():
+    # The Overview tab's callbacks on first load
+    return ['overview'] + default_filters()
+
+FILTER_INPUTS = [
     Input('status-filter', 'value'),
     Input('source-filter', 'value'),
     Input('date-picker-range', 'start_date'),
     Input('date-picker-range', 'end_date'),
     Input('search-input', 'value')
-)
-def update_charts(selected_statuses, selected_sources, start_date, end_date, search_value):
-    # Filter data based on selections
-    filtered_df = df_leads.copy()
-    if selected_statuses:
-        filtered_df = filtered_df[filtered_df['Lead Status'].isin(selected_statuses)]
-    if selected_sources:
-        filtered_df = filtered_df[filtered_df['Lead Source'].isin(selected_sources)]
-    if start_date and end_date:
-        filtered_df = filtered_df[(filtered_df['Creation Date'] >= start_date) & (filtered_df['Creation Date'] <= end_date)]
-    if search_value:
-        filtered_df = filtered_df[filtered_df['Lead Name'].str.contains(search_value, case=False, na=False)]
-    
-    # Update charts with filtered data
-    # Sunburst Chart
-    sunburst_data = filtered_df.groupby(['Lead Source', 'Lead Status']).size().reset_index(name='count')
+]
+
+# Figures
+def sunburst_figure(summary):
     fig_sunburst = px.sunburst(
-        sunburst_data,
+        summary['source_status'],
         path=['Lead Source', 'Lead Status'],
         values='count',
         title='Lead Source and Status Breakdown'
     )
     fig_sunburst.update_layout(template=chart_template)
-    
-    # Heatmap Chart
-    heatmap_data = filtered_df.pivot_table(
-        index='Property Type',
-        columns='Lead Status',
-        values='Budget From',
-        aggfunc='mean'
-    )
+    return fig_sunburst
+
+def heatmap_figure(summary):
     fig_heatmap = px.imshow(
-        heatmap_data,
+        summary['budget_heatmap'],
         labels=dict(x="Lead Status", y="Property Type", color="Average Budget"),
         title="Average Budget Heatmap"
     )
     fig_heatmap.update_layout(template=chart_template)
-    
-    # Bubble Chart
-    bubble_data = filtered_df.copy()
-    bubble_data['Budget Average'] = (bubble_data['Budget From'] + bubble_data['Budget To']) / 2
+    return fig_heatmap
+
+def bubble_figure(view):
     fig_bubble = px.scatter(
-        bubble_data,
+        view.frame(BUBBLE_COLUMNS),
         x='Budget Average',
         y='Property Type',
         size='Budget Average',
@@ -408,38 +400,138 @@ def update_charts(selected_statuses, selected_sources, start_date, end_date, sea
         title='Budget vs. Property Type Bubble Chart'
     )
     fig_bubble.update_layout(template=chart_template)
-    
-    # Treemap Chart
-    treemap_data = filtered_df.groupby(['District Name', 'Property Type']).size().reset_index(name='count')
+    return fig_bubble
+
+def treemap_figure(summary):
     fig_treemap = px.treemap(
-        treemap_data,
+        summary['district_property'],
         path=['District Name', 'Property Type'],
         values='count',
         title='Leads Distribution Treemap'
     )
     fig_treemap.update_layout(template=chart_template)
-    
-    # Funnel Chart
-    funnel_stages = filtered_df['Lead Status'].value_counts().reset_index()
-    funnel_stages.columns = ['Stage', 'Number of Leads']
+    return fig_treemap
+
+def funnel_figure(summary):
+    funnel_stages = summary['status_counts']
     fig_funnel = go.Figure(go.Funnel(
         y=funnel_stages['Stage'],
         x=funnel_stages['Number of Leads'],
         textinfo="value+percent initial"
     ))
     fig_funnel.update_layout(template=chart_template, title='Lead Conversion Funnel')
-    
-    # Calendar Heatmap
-    heatmap_counts = filtered_df.copy()
-    heatmap_counts['Date'] = heatmap_counts['Creation Date'].dt.date
-    heatmap_counts = heatmap_counts.groupby('Date').size().reset_index(name='Leads')
+    return fig_funnel
+
+def calendar_figure(summary):
     fig_calendar_heatmap = px.density_heatmap(
-        heatmap_counts,
+        summary['daily_counts'],
         x='Date',
         y='Leads',
         nbinsx=30,
         title='Leads per Day Heatmap'
     )
     fig_calendar_heatmap.update_layout(template=chart_template)
-    
-    return fig_sunburst, fig_heatmap, fig_bubble, fig_treemap, fig_funnel, fig_calendar_heatmap, filtered_df.to_dict('records')
+    return fig_calendar_heatmap
+
+# One callback per figure. Each is only built while its tab is open, and
+# catches up on the current filters when the tab is opened. Results are memoized
+# per filter state and leads version, and identical concurrent requests
+# share one computation. The default state and the states most often
+# requested are computed ahead at startup (see utils/warmup.py). A filter
+# change only sends the new trace data of a figure already on the page.
+@callback(Output('sunburst-chart', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS)
+@warm_callback(default_overview, dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_sunburst(active_tab, *filters):
+    if active_tab != 'overview':
+        raise PreventUpdate
+    return sunburst_figure(select_leads(*filters)[1])
+
+@callback(Output('heatmap-chart', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS)
+@warm_callback(default_overview, dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_heatmap(active_tab, *filters):
+    if active_tab != 'overview':
+        raise PreventUpdate
+    return heatmap_figure(select_leads(*filters)[1])
+
+@callback(Output('bubble-chart', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS, replace_traces=True)
+@warm_callback(dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_bubble(active_tab, *filters):
+    if active_tab != 'detailed':
+        raise PreventUpdate
+    return bubble_figure(select_leads(*filters)[0])
+
+@callback(Output('treemap-chart', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS)
+@warm_callback(dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_treemap(active_tab, *filters):
+    if active_tab != 'detailed':
+        raise PreventUpdate
+    return treemap_figure(select_leads(*filters)[1])
+
+@callback(Output('funnel-chart', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS)
+@warm_callback(dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_funnel(active_tab, *filters):
+    if active_tab != 'detailed':
+        raise PreventUpdate
+    return funnel_figure(select_leads(*filters)[1])
+
+@callback(Output('calendar-heatmap', 'figure'), Input('lead-tabs', 'active_tab'), *FILTER_INPUTS)
+@patch_figures(FILTER_INPUTS)
+@warm_callback(dates=(3, 4))
+@coalesce_callback(dates=(3, 4))
+@memoize_callback('leads', dates=(3, 4))
+def update_calendar(active_tab, *filters):
+    if active_tab != 'detailed':
+        raise PreventUpdate
+    return calendar_figure(select_leads(*filters)[1])
+
+# The table's rows in display order for one filter state: page filters, then
+# the table's own filter query and sort. Kept per state, so paging through
+# the same state only slices the cached order.
+@lru_cache(maxsize=32)
+def table_view(selected_statuses, selected_sources, start_date, end_date, search_value, filter_query, sort_by):
+    view = lead_selection(selected_statuses, selected_sources, start_date, end_date, search_value)[0]
+    view = filter_view(view, parse_filter_query(filter_query), load_lead_index())
+    return sort_view(view, [{'column_id': column, 'direction': direction} for column, direction in sort_by])
+
+# Only the visible page of the table is serialized, and only while the
+# Data Table tab is open. A page past the end of a shrunken result moves
+# back to the last page.
+@callback(
+    Output('data-table', 'data'),
+    Output('data-table', 'page_count'),
+    Output('data-table', 'page_current'),
+    Input('lead-tabs', 'active_tab'),
+    *FILTER_INPUTS,
+    Input('data-table', 'page_current'),
+    Input('data-table', 'page_size'),
+    Input('data-table', 'sort_by'),
+    Input('data-table', 'filter_query')
+)
+@coalesce_callback(dates=(3, 4))
+def update_table(active_tab, selected_statuses, selected_sources, start_date, end_date, search_value,
+                 page_current, page_size, sort_by, filter_query):
+    if active_tab != 'table':
+        raise PreventUpdate
+    view = table_view(tuple(selected_statuses or ()), tuple(selected_sources or ()), start_date, end_date,
+                      search_value or None, filter_query or '',
+                      tuple((entry['column_id'], entry['direction']) for entry in sort_by or []))
+    page_size = page_size or 10
+    page_count = max(1, -(-len(view) // page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    page = view.take(np.arange(page_current * page_size, min((page_current + 1) * page_size, len(view))))
+    return page.frame(table_columns(view.base)).to_dict('records'), page_count, page_current
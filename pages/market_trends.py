@@ -4,17 +4,14 @@ import pandas as pd
 from dash import html, dcc, callback, Output, Input
 import plotly.express as px
 import dash_bootstrap_components as dbc
-
-# Load and preprocess data
-df = pd.read_excel('data/Prime_TCR.xls')
-
-# Data Preprocessing
-df.columns = df.columns.str.strip()
-df['Contracted Date'] = pd.to_datetime(df['Contracted Date'], errors='coerce')
-df['Lead Creation Date'] = pd.to_datetime(df['Lead Creation Date'], errors='coerce')
-df['Time to Contract'] = (df['Contracted Date'] - df['Lead Creation Date']).dt.days
-df['Commission Ratio'] = pd.to_numeric(df['Commission Ratio'], errors='coerce')
-df['Sales Volume'] = pd.to_numeric(df['Sales Volume'], errors='coerce')
+from functools import lru_cache
+from utils.bitmaps import BitmapIndex
+from utils.datasets import get_dataset
+from utils.date_index import DateIndex
+from utils.figure_cache import memoize_callback
+from utils.figure_patch import patch_figures
+from utils.frame_view import FrameView
+from utils.warmup import warm_callback
 
 # Theme colors matching agent_performance
 theme_colors = {
@@ -52,126 +49,152 @@ chart_template = {
     }
 }
 
-# Define the layout
-layout = dbc.Container([
-    html.H1("Sales Transaction Dashboard", 
-            className="text-center my-4",
-            style={'color': theme_colors['accent1']}),
+# Transaction columns the charts read
+CHART_COLUMNS = ['Contracted Date', 'Sales Volume', 'Owner', 'Developer', 'Project', 'Commission Ratio',
+                 'TCR Status', 'Time to Contract', 'Lead Source']
 
-    # Filters
-    dbc.Card([
-        dbc.CardBody([
-            dbc.Row([
-                dbc.Col([
-                    html.Label('Select Owner:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
-                    dcc.Dropdown(
-                        id='owner-filter',
-                        options=[{'label': owner, 'value': owner} for owner in df['Owner'].dropna().unique()],
-                        value=[],
-                        multi=True,
-                        className="w-100"
-                    )
-                ], width=6),
-                dbc.Col([
-                    html.Label('Select Date Range:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
-                    dcc.DatePickerRange(
-                        id='date-filter',
-                        start_date=df['Contracted Date'].min(),
-                        end_date=df['Contracted Date'].max(),
-                        className="w-100"
-                    )
-                ], width=6)
-            ])
-        ])
-    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4"),
+# Bitsets of the transactions of each owner, for the owner filter
+@lru_cache(maxsize=None)
+def load_transaction_index():
+    return BitmapIndex(get_dataset('transactions'), ['Owner'])
 
-    # KPIs
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody(id='total-sales')
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
-        ], width=12, md=4, className="mb-4"),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody(id='total-transactions')
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
-        ], width=12, md=4, className="mb-4"),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody(id='average-commission')
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
-        ], width=12, md=4, className="mb-4")
-    ]),
+# Transactions sorted by contract date within each owner, with prefix sums
+# for the KPIs. The date range covers whole days, the end day included, as
+# on the other pages
+@lru_cache(maxsize=None)
+def load_transaction_dates():
+    df = get_dataset('transactions')
+    return DateIndex(df['Contracted Date'], {'Sales Volume': df['Sales Volume'], 'Commission Ratio': df['Commission Ratio']},
+                     groups=df['Owner'], days=True)
 
-    # Charts
-    dbc.Tabs([
-        dbc.Tab(label='Sales Overview', children=[
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='sales-over-time')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='top-agents')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12, lg=6),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='sales-by-project')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12, lg=6)
-            ])
-        ], style={'color': theme_colors['text']}),
-        dbc.Tab(label='Performance Analysis', children=[
-            dbc.Row([
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='commission-distribution')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12, lg=6),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='conversion-funnel')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12, lg=6),
-                dbc.Col([
-                    dbc.Card([
-                        dbc.CardBody([
-                            dcc.Graph(id='time-to-contract')
-                        ])
-                    ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-                ], width=12)
+# Define the layout, built on the first visit to the page
+def layout():
+    df = get_dataset('transactions')
+
+    return dbc.Container([
+        html.H1("Sales Transaction Dashboard", 
+                className="text-center my-4",
+                style={'color': theme_colors['accent1']}),
+
+        # Filters
+        dbc.Card([
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col([
+                        html.Label('Select Owner:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
+                        dcc.Dropdown(
+                            id='owner-filter',
+                            options=[{'label': owner, 'value': owner} for owner in df['Owner'].dropna().unique()],
+                            value=[],
+                            multi=True,
+                            className="w-100"
+                        )
+                    ], width=6),
+                    dbc.Col([
+                        html.Label('Select Date Range:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
+                        dcc.DatePickerRange(
+                            id='date-filter',
+                            start_date=df['Contracted Date'].min(),
+                            end_date=df['Contracted Date'].max(),
+                            className="w-100"
+                        )
+                    ], width=6)
+                ])
             ])
-        ], style={'color': theme_colors['text']}),
-        dbc.Tab(label='Lead Source Analysis', children=[
-            dbc.Card([
-                dbc.CardBody([
-                    dcc.Graph(id='sales-by-lead-source')
+        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4"),
+
+        # KPIs
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody(id='total-sales')
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
+            ], width=12, md=4, className="mb-4"),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody(id='total-transactions')
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
+            ], width=12, md=4, className="mb-4"),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody(id='average-commission')
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["accent1"]}'}, className="text-center h-100")
+            ], width=12, md=4, className="mb-4")
+        ]),
+
+        # Charts
+        dbc.Tabs([
+            dbc.Tab(label='Sales Overview', children=[
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='sales-over-time')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='top-agents')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12, lg=6),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='sales-by-project')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12, lg=6)
                 ])
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-        ], style={'color': theme_colors['text']}),
-        dbc.Tab(label='Correlation Analysis', children=[
-            dbc.Card([
-                dbc.CardBody([
-                    dcc.Graph(id='correlation-matrix')
+            ], style={'color': theme_colors['text']}),
+            dbc.Tab(label='Performance Analysis', children=[
+                dbc.Row([
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='commission-distribution')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12, lg=6),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='conversion-funnel')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12, lg=6),
+                    dbc.Col([
+                        dbc.Card([
+                            dbc.CardBody([
+                                dcc.Graph(id='time-to-contract')
+                            ])
+                        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+                    ], width=12)
                 ])
-            ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
-        ], style={'color': theme_colors['text']})
-    ], className="mb-4"),
-], fluid=True, style={'backgroundColor': theme_colors['background'], 'minHeight': '100vh', 'padding': '20px'})
+            ], style={'color': theme_colors['text']}),
+            dbc.Tab(label='Lead Source Analysis', children=[
+                dbc.Card([
+                    dbc.CardBody([
+                        dcc.Graph(id='sales-by-lead-source')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+            ], style={'color': theme_colors['text']}),
+            dbc.Tab(label='Correlation Analysis', children=[
+                dbc.Card([
+                    dbc.CardBody([
+                        dcc.Graph(id='correlation-matrix')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4")
+            ], style={'color': theme_colors['text']})
+        ], className="mb-4"),
+    ], fluid=True, style={'backgroundColor': theme_colors['background'], 'minHeight': '100vh', 'padding': '20px'})
+
+def default_filters():
+    # The filters as the layout first sends them
+    dates = get_dataset('transactions')['Contracted Date']
+    return [[], dates.min(), dates.max()]
 
 @callback(
     [Output('total-sales', 'children'),
@@ -189,29 +212,41 @@ layout = dbc.Container([
      Input('date-filter', 'start_date'),
      Input('date-filter', 'end_date')]
 )
+@patch_figures(['owner-filter', 'date-filter'], outputs=range(3, 11))
+@warm_callback(default_filters, dates=(1, 2))
+@memoize_callback('transactions', dates=(1, 2))
 def update_dashboard(selected_owners, start_date, end_date):
-    filtered_df = df.copy()
+    df = get_dataset('transactions')
 
-    # Apply filters
-    if selected_owners:
-        filtered_df = filtered_df[filtered_df['Owner'].isin(selected_owners)]
-    if start_date and end_date:
-        filtered_df = filtered_df[(filtered_df['Contracted Date'] >= start_date) & (filtered_df['Contracted Date'] <= end_date)]
+    # Apply filters: a date range is a slice of the sorted date index
+    index, dates = load_transaction_index(), load_transaction_dates()
+    if not (start_date and end_date):
+        start_date = end_date = None
+    matches = index.select({'Owner': selected_owners})
+    if start_date:
+        positions = dates.positions(start_date, end_date)
+        positions = positions[index.test(matches, positions)]
+    else:
+        positions = index.positions(matches)
+    # Only the charted columns of the selected rows are taken from the shared frame
+    filtered_df = FrameView(df, positions).frame(CHART_COLUMNS)
 
-    # KPIs
-    total_sales_value = filtered_df['Sales Volume'].sum()
+    # KPIs, as differences of prefix sums over the selected owners' date ranges
+    total_sales_value = dates.total('Sales Volume', start_date, end_date, selected_owners)
     total_sales = [
         html.H3(f"{total_sales_value:,.2f}", style={'color': theme_colors['accent1']}, className="mb-0"),
         html.P("Total Sales Volume", style={'color': theme_colors['text']}, className="mb-0")
     ]
 
-    total_transactions_value = len(filtered_df)
+    total_transactions_value = dates.size(start_date, end_date, selected_owners)
     total_transactions = [
         html.H3(f"{total_transactions_value}", style={'color': theme_colors['accent1']}, className="mb-0"),
         html.P("Total Transactions", style={'color': theme_colors['text']}, className="mb-0")
     ]
 
-    average_commission_value = filtered_df['Commission Ratio'].mean()
+    commission_count = dates.count('Commission Ratio', start_date, end_date, selected_owners)
+    average_commission_value = (dates.total('Commission Ratio', start_date, end_date, selected_owners) / commission_count
+                                if commission_count else float('nan'))
     average_commission = [
         html.H3(f"{average_commission_value:.2%}", style={'color': theme_colors['accent1']}, className="mb-0"),
         html.P("Average Commission Ratio", style={'color': theme_colors['text']}, className="mb-0")
@@ -1,16 +1,17 @@
 # pages/contact_analysis.py
 
-import pandas as pd
 from dash import html, dcc, callback, Output, Input
 import plotly.graph_objects as go
 import plotly.express as px
 import dash_bootstrap_components as dbc
-import re
-import networkx as nx
-import numpy as np
-
-# Load data
-df = pd.read_csv('data/Contact_With_Comments.csv')
+from functools import lru_cache
+from utils.actions import classify_actions
+from utils.datasets import get_dataset
+from utils.figure_cache import memoize_callback
+from utils.flow_layout import flow_layout
+from utils.single_flight import coalesce_callback
+from utils.transitions import TransitionStore
+from utils.warmup import warm_callback
 
 # Modern futuristic theme matching agent_performance
 theme_colors = {
@@ -46,295 +47,184 @@ chart_template = {
     }
 }
 
-# Data preprocessing
-def extract_actions(comments):
-    if pd.isna(comments):
-        return []
-        
-    # Split comments by '||' and remove any leading/trailing whitespace
-    actions = [action.strip() for action in comments.split('||') if action.strip()]
-    action_types = []
-    
-    for action in actions:
-        # Remove any HTML tags
-        action = re.sub('<[^<]+?>', '', action)
-        
-        # Skip empty or purely descriptive comments
-        if not action or action.startswith(('NA', 'F', 'in contact', 'working', 'available', 'closed', 'Template Done')):
-            continue
-            
-        # Extract the action type
-        action_lower = action.lower()
-        
-        if 'was created by' in action_lower:
-            if 'lead ticket' in action_lower:
-                action_type = 'Lead Ticket Was Created'
-            elif 'call' in action_lower:
-                action_type = 'Call Was Created'
-            elif 'request' in action_lower:
-                action_type = 'Request Was Created'
-            elif 'prospect' in action_lower:
-                action_type = 'Prospect Was Created'
-            else:
-                continue
-                
-        elif 'was assigned to branch' in action_lower:
-            if 'lead ticket' in action_lower:
-                action_type = 'Lead Ticket Was Assigned to Branch'
-            elif 'call' in action_lower:
-                action_type = 'Call Was Assigned to Branch'
-            else:
-                continue
-                
-        elif 'was assigned to agent' in action_lower:
-            if 'lead ticket' in action_lower:
-                action_type = 'Lead Ticket Was Assigned to Agent'
-            elif 'call' in action_lower:
-                action_type = 'Call Was Assigned to Agent'
-            else:
-                continue
-                
-        elif 'was converted to' in action_lower:
-            if 'request' in action_lower:
-                action_type = 'Lead Ticket Was Converted to Request'
-            elif 'prospect' in action_lower:
-                action_type = 'Lead Ticket Was Converted to Prospect'
-            else:
-                continue
-                
-        elif 'was rejected' in action_lower:
-            action_type = 'Lead Ticket Was Rejected'
-            
-        elif 'was set unqualified' in action_lower:
-            action_type = 'Lead Ticket Was Set Unqualified'
-            
-        elif 'was voided' in action_lower:
-            action_type = 'Lead Ticket Was Voided'
-            
-        elif 'status was changed to' in action_lower:
-            new_status = action_lower.split('status was changed to')[1].split('by')[0].strip()
-            action_type = f'Status Changed to {new_status.title()}'
-            
-        else:
-            continue
-            
-        action_types.append(action_type)
-        
-    return action_types
-
-df['Action Types'] = df['Comments'].apply(extract_actions)
-
-def map_action_to_stage(action_type):
-    if 'Lead Ticket Was Created' in action_type:
-        return 'Lead Created'
-    elif 'Lead Ticket Was Assigned to Branch' in action_type:
-        return 'Assigned to Branch'
-    elif 'Lead Ticket Was Assigned to Agent' in action_type:
-        return 'Assigned to Agent'
-    elif 'Lead Ticket Was Converted to Request' in action_type:
-        return 'Converted to Request'
-    elif 'Request Was Created' in action_type:
-        return 'Request Created'
-    elif 'Lead Ticket Was Converted to Prospect' in action_type:
-        return 'Converted to Prospect'
-    elif 'Prospect Was Created' in action_type:
-        return 'Prospect Created'
-    elif any(x in action_type for x in ['Was Set Unqualified', 'Status Changed to Unqualified']):
-        return 'Closed - Unqualified'
-    elif 'Was Voided' in action_type:
-        return 'Closed - Voided'
-    elif 'Was Rejected' in action_type:
-        return 'Closed - Rejected'
-    elif 'Call Was Created' in action_type:
-        return 'Call Created'
-    elif 'Call Was Assigned to Branch' in action_type:
-        return 'Call Assigned to Branch'
-    elif 'Call Was Assigned to Agent' in action_type:
-        return 'Call Assigned to Agent'
-    else:
-        return 'Other'
-
-df['Stages'] = df['Action Types'].apply(lambda actions: [map_action_to_stage(a) for a in actions])
-
-# Prepare transitions data for Sankey Diagram and Network Graph
-transitions = []
-
-for stages in df['Stages']:
-    # Remove consecutive duplicate stages
-    stages = [stage for i, stage in enumerate(stages) if i == 0 or stage != stages[i-1]]
-    for i in range(len(stages) - 1):
-        source = stages[i]
-        target = stages[i + 1]
-        transitions.append((source, target))
-
-transition_counts = pd.DataFrame(transitions, columns=['source', 'target']).value_counts().reset_index(name='count')
-
-# Generate labels and indices
-all_stages = list(set([stage for stages in df['Stages'] for stage in stages]))
-label_indices = {label: idx for idx, label in enumerate(all_stages)}
-
-# Assign colors to nodes using theme colors
-stage_colors = {stage: theme_colors['accent1'] for stage in all_stages}
-node_colors = [stage_colors[stage] for stage in all_stages]
-
-# Get the final stage for each contact
-df['Final Stage'] = df['Stages'].apply(lambda x: x[-1] if x else 'Unknown')
-
-# Count the number of contacts at each final stage
-stage_counts = df['Final Stage'].value_counts().reset_index()
-stage_counts.columns = ['Stage', 'Count']
-
-# Flatten the list of action types
-all_actions = [action for actions in df['Action Types'] for action in actions]
-
-# Count the occurrences of each action
-action_counts = pd.Series(all_actions).value_counts().reset_index()
-action_counts.columns = ['Action', 'Count']
+# Contact preprocessing, transitions and network layout are computed on the
+# first request rather than at import, and then reused by every callback
+@lru_cache(maxsize=None)
+def load_contact_analysis():
+    df = get_dataset('contacts')
 
-# Create a NetworkX graph for the flow diagram
-G = nx.DiGraph()
-for _, row in transition_counts.iterrows():
-    G.add_edge(row['source'], row['target'], weight=row['count'])
+    # Action events and every count derived from them come from one pass;
+    # the shared contacts frame is read-only
+    actions = classify_actions(df['Comments'])
 
-# Calculate node levels based on shortest path from start
-start_nodes = [node for node in G.nodes() if G.in_degree(node) == 0]
-if not start_nodes:
-    start_nodes = [list(G.nodes())[0]]  # Fallback if no clear start
+    # Each contact is filed under the branch and agent it was last assigned to
+    assignments = actions.groupby('contact')[['branch', 'agent']].last().reindex(range(len(df)))
 
-# Assign levels to nodes
-node_levels = {}
-for start_node in start_nodes:
-    for node in G.nodes():
-        if node not in node_levels:
-            try:
-                level = len(nx.shortest_path(G, start_node, node)) - 1
-                node_levels[node] = level
-            except nx.NetworkXNoPath:
-                continue
+    # Counts per (day, branch, agent) partition, summed on every filter change
+    store = TransitionStore(actions['contact'].to_numpy(), actions['action_type'].to_numpy(),
+                            df['Contact Creation Date'], assignments['branch'], assignments['agent'],
+                            values=df['Number Of Contact'])
+    transitions = store.query()
+    transition_counts = transitions['transition_counts']
+    stage_counts = transitions['stage_counts']
+    action_counts = transitions['action_counts']
 
-# Assign remaining nodes that weren't reached
-max_level = max(node_levels.values()) if node_levels else 0
-for node in G.nodes():
-    if node not in node_levels:
-        node_levels[node] = max_level + 1
+    # Generate labels and indices
+    all_stages = transitions['stages']
+    label_indices = {label: idx for idx, label in enumerate(all_stages)}
 
-# Explicitly add subset attribute to nodes
-for node, level in node_levels.items():
-    G.nodes[node]['subset'] = level
+    # Assign colors to nodes using theme colors
+    stage_colors = {stage: theme_colors['accent1'] for stage in all_stages}
+    node_colors = [stage_colors[stage] for stage in all_stages]
 
-# Calculate node statistics
-node_stats = {node: {
-    'incoming': sum(d['weight'] for _, _, d in G.in_edges(node, data=True)),
-    'outgoing': sum(d['weight'] for _, _, d in G.out_edges(node, data=True))
-} for node in G.nodes()}
+    # Network positions and traces, reused from disk while the counts are unchanged
+    network = flow_layout(transition_counts)
 
-# Use multipartite_layout with explicit subset attribute
-pos = nx.multipartite_layout(G, subset_key='subset', scale=2.0)
+    return {
+        'df': df,
+        'actions': actions,
+        'store': store,
+        'all_stages': all_stages,
+        'node_colors': node_colors,
+        'label_indices': label_indices,
+        'transition_counts': transition_counts,
+        'stage_counts': stage_counts,
+        'action_counts': action_counts,
+        **network,
+    }
 
-# Create edge traces
-edge_x = []
-edge_y = []
-edge_texts = []
-for edge in G.edges(data=True):
-    x0, y0 = pos[edge[0]]
-    x1, y1 = pos[edge[1]]
-    edge_x.extend([x0, x1, None])
-    edge_y.extend([y0, y1, None])
-    edge_texts.append(f"From {edge[0]} to {edge[1]}<br>Count: {edge[2]['weight']}")
+# Layout with modern styling, built on the first visit to the page
+def layout():
+    data = load_contact_analysis()
+    df, store = data['df'], data['store']
 
-# Create node traces
-node_x = []
-node_y = []
-node_texts = []
-node_labels = []
-node_sizes = []
-for node in G.nodes():
-    x, y = pos[node]
-    node_x.append(x)
-    node_y.append(y)
-    node_labels.append(node)
-    hover_text = (
-        f"Stage: {node}<br>"
-        f"Incoming contacts: {node_stats[node]['incoming']}<br>"
-        f"Outgoing contacts: {node_stats[node]['outgoing']}<br>"
-        f"Total flow: {node_stats[node]['incoming'] + node_stats[node]['outgoing']}"
-    )
-    node_texts.append(hover_text)
-    node_sizes.append(np.sqrt(node_stats[node]['incoming'] + node_stats[node]['outgoing']) * 10)
+    return dbc.Container([
+        html.H1("Contact Analysis Dashboard", 
+                className="text-center my-4",
+                style={'color': theme_colors['accent1']}),
 
-# Layout with modern styling
-layout = dbc.Container([
-    html.H1("Contact Analysis Dashboard", 
-            className="text-center my-4",
-            style={'color': theme_colors['accent1']}),
-            
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H2("Contact Stage Transitions (Sankey)", 
-                                     className="text-center",
-                                     style={'color': theme_colors['accent1']})),
-                dbc.CardBody([
-                    dcc.Graph(id='operational-sankey-diagram')
+        # Filters
+        dbc.Card([
+            dbc.CardBody([
+                dbc.Row([
+                    dbc.Col([
+                        html.Label('Contact Creation Date:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
+                        dcc.DatePickerRange(
+                            id='operational-date-filter',
+                            start_date=df['Contact Creation Date'].min(),
+                            end_date=df['Contact Creation Date'].max(),
+                            className="w-100"
+                        )
+                    ], width=12, lg=4),
+                    dbc.Col([
+                        html.Label('Select Branch:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
+                        dcc.Dropdown(
+                            id='operational-branch-filter',
+                            options=[{'label': branch, 'value': branch} for branch in store.branches()],
+                            value=[],
+                            multi=True,
+                            className="w-100"
+                        )
+                    ], width=12, lg=4),
+                    dbc.Col([
+                        html.Label('Select Agent:', className="fw-bold mb-2", style={'color': theme_colors['text']}),
+                        dcc.Dropdown(
+                            id='operational-agent-filter',
+                            options=[{'label': agent, 'value': agent} for agent in store.agents()],
+                            value=[],
+                            multi=True,
+                            className="w-100"
+                        )
+                    ], width=12, lg=4)
                 ])
-            ], style={'background': theme_colors['card_bg'], 
-                     'border': f'1px solid {theme_colors["grid"]}'}, 
-               className="mb-4")
-        ], width=12),
+            ])
+        ], style={'background': theme_colors['card_bg'], 'border': f'1px solid {theme_colors["grid"]}'}, className="mb-4"),
+
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Contact Stage Transitions (Sankey)", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-sankey-diagram')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H2("Contact Stage Network Flow", 
-                                     className="text-center",
-                                     style={'color': theme_colors['accent1']})),
-                dbc.CardBody([
-                    dcc.Graph(id='operational-network-diagram')
-                ])
-            ], style={'background': theme_colors['card_bg'], 
-                     'border': f'1px solid {theme_colors["grid"]}'}, 
-               className="mb-4")
-        ], width=12),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Contact Stage Network Flow", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-network-diagram')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H2("Contact Final Stages Funnel", 
-                                     className="text-center",
-                                     style={'color': theme_colors['accent1']})),
-                dbc.CardBody([
-                    dcc.Graph(id='operational-funnel-chart')
-                ])
-            ], style={'background': theme_colors['card_bg'], 
-                     'border': f'1px solid {theme_colors["grid"]}'}, 
-               className="mb-4")
-        ], width=12, lg=6),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Contact Final Stages Funnel", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-funnel-chart')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12, lg=6),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H2("Top Actions Taken", 
-                                     className="text-center",
-                                     style={'color': theme_colors['accent1']})),
-                dbc.CardBody([
-                    dcc.Graph(id='operational-action-counts-bar')
-                ])
-            ], style={'background': theme_colors['card_bg'], 
-                     'border': f'1px solid {theme_colors["grid"]}'}, 
-               className="mb-4")
-        ], width=12, lg=6),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Top Actions Taken", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-action-counts-bar')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12, lg=6),
         
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader(html.H2("Distribution of Number of Contacts", 
-                                     className="text-center",
-                                     style={'color': theme_colors['accent1']})),
-                dbc.CardBody([
-                    dcc.Graph(id='operational-contacts-histogram')
-                ])
-            ], style={'background': theme_colors['card_bg'], 
-                     'border': f'1px solid {theme_colors["grid"]}'}, 
-               className="mb-4")
-        ], width=12)
-    ])
-], fluid=True)
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Top Contact Journeys", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-journeys-bar')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12),
+        
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(html.H2("Distribution of Number of Contacts", 
+                                         className="text-center",
+                                         style={'color': theme_colors['accent1']})),
+                    dbc.CardBody([
+                        dcc.Graph(id='operational-contacts-histogram')
+                    ])
+                ], style={'background': theme_colors['card_bg'], 
+                         'border': f'1px solid {theme_colors["grid"]}'}, 
+                   className="mb-4")
+            ], width=12)
+        ])
+    ], fluid=True)
+
+def default_filters():
+    # The filters as the layout first sends them
+    dates = get_dataset('contacts')['Contact Creation Date']
+    return [dates.min(), dates.max(), [], []]
 
 # Callback
 @callback(
@@ -343,10 +233,33 @@ layout = dbc.Container([
     Output('operational-funnel-chart', 'figure'),
     Output('operational-action-counts-bar', 'figure'),
     Output('operational-contacts-histogram', 'figure'),
-    Input('operational-sankey-diagram', 'id')  # Dummy input to trigger callback
+    Output('operational-journeys-bar', 'figure'),
+    Input('operational-date-filter', 'start_date'),
+    Input('operational-date-filter', 'end_date'),
+    Input('operational-branch-filter', 'value'),
+    Input('operational-agent-filter', 'value')
 )
-def update_figures(_):
-    # Sankey Diagram
+@warm_callback(default_filters, dates=(0, 1))
+@coalesce_callback(dates=(0, 1))
+@memoize_callback('contacts', dates=(0, 1))
+def update_figures(start_date, end_date, selected_branches, selected_agents):
+    data = load_contact_analysis()
+    all_stages, node_colors, label_indices = data['all_stages'], data['node_colors'], data['label_indices']
+
+    # Filtering sums the precomputed partition counts instead of re-reading comments
+    store = data['store']
+    filtered = store.query(start_date, end_date, selected_branches, selected_agents)
+    mask = store.select(start_date, end_date, selected_branches, selected_agents)
+    transition_counts, stage_counts, action_counts = filtered['transition_counts'], filtered['stage_counts'], filtered['action_counts']
+    contact_counts = filtered['value_counts']
+
+    # The unfiltered network comes from the cached layout
+    network = data if transition_counts.equals(data['transition_counts']) else flow_layout(transition_counts, cache=False)
+    edge_x, edge_y, edge_texts = network['edge_x'], network['edge_y'], network['edge_texts']
+    node_x, node_y, node_texts, node_sizes = network['node_x'], network['node_y'], network['node_texts'], network['node_sizes']
+
+    # Sankey Diagram, from the same transition counts as the network graph;
+    # stage nodes bound it to len(all_stages) ** 2 links
     sankey_fig = go.Figure(data=[go.Sankey(
         arrangement = "snap",
         node = dict(
@@ -442,15 +355,32 @@ def update_figures(_):
     
     # Histogram of Number of Contacts
     contacts_histogram_fig = px.histogram(
-        df,
-        x='Number Of Contact',
+        contact_counts,
+        x='value',
+        y='count',
+        histfunc='sum',
         nbins=10,
         color_discrete_sequence=[theme_colors['accent1']],
-        labels={'Number Of Contact': 'Number Of Contacts'}
+        labels={'value': 'Number Of Contacts'}
     )
-    contacts_histogram_fig.update_layout(height=400)
+    contacts_histogram_fig.update_layout(height=400, yaxis_title_text='count')
+    contacts_histogram_fig.update_traces(hovertemplate='Number Of Contacts=%{x}<br>count=%{y}<extra></extra>')
     for key, value in chart_template.items():
         contacts_histogram_fig.update_layout(**{key: value})
     
-    return sankey_fig, network_fig, funnel_fig, action_counts_fig, contacts_histogram_fig
+    # Most common complete journeys
+    journeys_fig = px.bar(
+        store.trie.top_journeys(10, mask),
+        x='Count',
+        y='Journey',
+        orientation='h',
+        color_discrete_sequence=[theme_colors['accent1']],
+        labels={'Count': 'Number of Contacts', 'Journey': 'Stage Journey'}
+    )
+    journeys_fig.update_layout(height=500)
+    for key, value in chart_template.items():
+        journeys_fig.update_layout(**{key: value})
+    journeys_fig.update_layout(yaxis={'categoryorder':'total ascending'})
+    
+    return sankey_fig, network_fig, funnel_fig, action_counts_fig, contacts_histogram_fig, journeys_fig
 # End of Selection
@@ -4,75 +4,23 @@ import pandas as pd
 from dash import html, dcc, callback, Output, Input,dash_table
 # import dash_table
 import plotly.express as px
-import osmnx as ox
-import geopandas as gpd
 import plotly.graph_objects as go
 import numpy as np
 import dash_bootstrap_components as dbc
-from datetime import datetime
+from utils.datasets import get_dataset
+from utils.district_stats import DistrictStats
+from utils.geocoding import geocode_districts
+from utils.geometry import get_district_geometry_provider
 
-# Read the data from 'Leads_Info.xlsx'
-df_leads = pd.read_excel('./data/Leads_Info.xlsx')
-
-# Data Preprocessing
-df_leads.columns = df_leads.columns.str.strip()
-df_leads['District Name'] = df_leads['District Name'].str.strip()
-df_leads['Budget From'] = pd.to_numeric(df_leads['Budget From'], errors='coerce')
-df_leads['Creation Date'] = pd.to_datetime(df_leads['Creation Date'])
-df_leads.fillna({'Budget From': 0}, inplace=True)
+# Shared, preprocessed leads from 'Leads_Info.xlsx'
+df_leads = get_dataset('leads')
 
 # Calculate district stats
-district_stats = df_leads.groupby('District Name').agg({
-    'Lead ID': 'count',
-    'Budget From': ['mean', 'sum'],
-    'Property Type': lambda x: x.value_counts().index[0] if len(x) > 0 else 'Unknown',
-    'Line of Business': lambda x: x.value_counts().index[0] if len(x) > 0 else 'Unknown',
-    'Creation Date': lambda x: (datetime.now() - x.max()).days  # Days since last lead
-}).round(2)
-
-district_stats.columns = ['Lead Count', 'Avg Budget', 'Total Budget', 'Most Common Property', 'Primary Business', 'Days Since Last Lead']
-district_stats = district_stats.reset_index()
+district_stats = DistrictStats(df_leads).frame()
 
 # Get unique district names
 districts = df_leads['District Name'].unique()
 
-# Initialize an empty GeoDataFrame
-gdf_districts = gpd.GeoDataFrame()
-
-# Expanded district name mapping
-district_mapping = {
-    'new cairo': ['new cairo', 'new cairo city', 'cairo new', 'tagamoa', 'tagammoa', 'el tagamoa', 'al tagamoa'],
-    'maadi': ['maadi', 'el maadi', 'al maadi', 'madi', 'el madi'],
-    'nasr city': ['nasr city', 'nasr', 'nasrcity', 'madinet nasr', 'madinat nasr'],
-    'heliopolis': ['heliopolis', 'misr el gedida', 'misr al gedida', 'masr el gedida'],
-    'zamalek': ['zamalek', 'el zamalek', 'al zamalek'],
-    'dokki': ['dokki', 'el dokki', 'al dokki', 'doqi'],
-    'mohandessin': ['mohandessin', 'mohandiseen', 'mohandseen', 'el mohandessin'],
-    'october': ['6th october', 'october', '6 october', 'sixth october'],
-    'sheikh zayed': ['sheikh zayed', 'zayed', 'zayed city', 'el sheikh zayed'],
-    'garden city': ['garden city', 'garden', 'el garden city']
-}
-
-# Enhanced district name standardization
-def standardize_district(district):
-    if pd.isna(district):
-        return None
-    district = district.lower().strip()
-    # Remove common prefixes/suffixes
-    prefixes = ['el ', 'al ', 'el-', 'al-']
-    for prefix in prefixes:
-        if district.startswith(prefix):
-            district = district[len(prefix):]
-    
-    # Check mapping
-    for standard, variations in district_mapping.items():
-        if district in variations or any(var in district for var in variations):
-            return standard
-            
-    return district
-
-df_leads['District Name'] = df_leads['District Name'].apply(standardize_district)
-
 # Modern futuristic theme consistent with other pages
 theme_colors = {
     'primary': '#1A237E',  # Deep indigo
@@ -85,37 +33,16 @@ theme_colors = {
     'grid': '#233554'       # Grid lines color
 }
 
-# Enhanced geocoding with multiple search strategies
-for district in districts:
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # Expanded search variations
-            place_variations = [
-                f"{district.upper()}, Cairo, Egypt",
-                f"{district.upper()} District, Cairo, Egypt",
-                f"{district.upper()}, Egypt",
-                f"District {district.upper()}, Cairo",
-                f"{district.title()}, Greater Cairo"
-            ]
-            
-            for place in place_variations:
-                try:
-                    gdf = ox.geocode_to_gdf(place)
-                    if not gdf.empty:
-                        gdf['district_name'] = district
-                        gdf_districts = pd.concat([gdf_districts, gdf], ignore_index=True)
-                        break
-                except Exception as e:
-                    continue
-            
-            if not gdf.empty:
-                break
-                
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"Failed to find geometry for {district.upper()} after {max_retries} attempts: {e}")
-            continue
+# District polygons come from the local shapefile; only names it cannot
+# match fall back to live geocoding
+gdf_districts, unmatched_districts = get_district_geometry_provider().to_gdf(districts)
+
+# Concurrent, rate-limited geocoding of the remaining districts, merged in once
+geocoded_districts, failed_districts = geocode_districts(unmatched_districts)
+for district in failed_districts:
+    print(f"Failed to find geometry for {district.upper()}")
+if not geocoded_districts.empty:
+    gdf_districts = pd.concat([gdf_districts, geocoded_districts], ignore_index=True)
 
 # Layout handling with consistent theme
 if gdf_districts.empty:
@@ -0,0 +1,70 @@
+# utils/bitmaps.py
+
+import numpy as np
+import pandas as pd
+
+# Set bits in every byte value, for counting rows in a bitset
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.int64)
+
+
+class BitmapIndex:
+    # One packed bitset per value of each indexed column: bit i of a value's
+    # bitset is set when row i holds that value. Bits are packed eight to a
+    # byte and padded to whole 64-bit words, so a filter is a few word-wide
+    # OR/AND passes over n_rows / 64 words instead of an isin over the rows.
+    # Missing values get no bitset, so they never match, as with isin.
+
+    def __init__(self, frame, columns):
+        self.n_rows = len(frame)
+        self.n_words = (self.n_rows + 63) // 64
+        self.bitmaps = {}
+        self._all = self._pack(np.arange(self.n_rows))
+        for column in columns:
+            codes, values = pd.factorize(frame[column])
+            # Rows grouped by value, so each bitset is packed from one slice
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            self.bitmaps[column] = {
+                value: self._pack(order[bounds[code]:bounds[code + 1]])
+                for code, value in enumerate(values)
+            }
+
+    def _pack(self, positions):
+        bits = np.zeros(self.n_words * 64, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits).view(np.uint64)
+
+    def all(self):
+        return self._all.copy()
+
+    def none(self):
+        return np.zeros(self.n_words, dtype=np.uint64)
+
+    def match(self, column, values):
+        # Rows holding any of `values` in `column`
+        bitmaps = self.bitmaps[column]
+        found = [bitmaps[value] for value in values if value in bitmaps]
+        if not found:
+            return self.none()
+        return np.bitwise_or.reduce(found, axis=0) if len(found) > 1 else found[0].copy()
+
+    def select(self, filters):
+        # filters: column -> selected values; empty or None selections leave
+        # the column unconstrained. Values OR within a column, columns AND.
+        bits = self.all()
+        for column, values in filters.items():
+            if values:
+                bits &= self.match(column, values)
+        return bits
+
+    def count(self, bits):
+        return int(_POPCOUNT[bits.view(np.uint8)].sum())
+
+    def test(self, bits, positions):
+        # Whether each of `positions` is set, without unpacking the bitset
+        data = bits.view(np.uint8)
+        return (data[positions >> 3] >> (7 - (positions & 7)) & 1).astype(bool)
+
+    def positions(self, bits):
+        # Matching row positions, ascending
+        return np.flatnonzero(np.unpackbits(bits.view(np.uint8), count=self.n_rows))
@@ -0,0 +1,111 @@
+# utils/datasets.py
+
+import threading
+import time
+
+import pandas as pd
+
+from utils.snapshots import read_snapshot, source_fingerprint
+
+# Central registry of the dashboard's datasets. Each source is parsed and
+# cleaned once per process, and every page shares the same frame, so the
+# frames returned by get_dataset must be treated as read-only: derive new
+# data with .assign()/.copy() instead of mutating them in place.
+
+_registry = {}
+_frames = {}
+_stats = {}
+_versions = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def register_dataset(name, source, prepare=None):
+    with _registry_lock:
+        _registry[name] = (source, prepare)
+        _locks.setdefault(name, threading.Lock())
+
+
+def get_dataset(name):
+    frame = _frames.get(name)
+    if frame is not None:
+        return frame
+
+    # One lock per dataset, so a slow workbook never blocks the others
+    with _locks[name]:
+        frame = _frames.get(name)
+        if frame is None:
+            source, prepare = _registry[name]
+            start = time.perf_counter()
+            frame = read_snapshot(source)
+            if prepare is not None:
+                frame = prepare(frame)
+            elapsed = time.perf_counter() - start
+
+            _stats[name] = {
+                'Dataset': name,
+                'Source': source,
+                'Rows': len(frame),
+                'Columns': len(frame.columns),
+                'Load Seconds': round(elapsed, 4),
+                'Memory MB': round(frame.memory_usage(deep=True).sum() / 2**20, 3),
+            }
+            _versions[name] = source_fingerprint(source)[:16]
+            _frames[name] = frame
+    return frame
+
+
+def dataset_version(name):
+    # Content fingerprint of the source the loaded frame came from, for keying
+    # results derived from it
+    get_dataset(name)
+    return _versions[name]
+
+
+def dataset_stats():
+    # Load time and memory footprint of every dataset loaded so far
+    return pd.DataFrame(list(_stats.values()),
+                        columns=['Dataset', 'Source', 'Rows', 'Columns', 'Load Seconds', 'Memory MB'])
+
+
+# Dataset preparation
+def _prepare_leads(df):
+    df.columns = df.columns.str.strip()
+    df['District Name'] = df['District Name'].str.strip()
+    df['Creation Date'] = pd.to_datetime(df['Creation Date'], errors='coerce')
+    df['Request Date'] = pd.to_datetime(df['Request Date'], errors='coerce')
+    df['Budget From'] = pd.to_numeric(df['Budget From'], errors='coerce')
+    df['Budget To'] = pd.to_numeric(df['Budget To'], errors='coerce')
+    df.fillna({'Budget From': 0, 'Budget To': 0}, inplace=True)
+    # Derived once here rather than on a copy in every callback
+    df['Budget Average'] = (df['Budget From'] + df['Budget To']) / 2
+    return df
+
+
+def _prepare_transactions(df):
+    df.columns = df.columns.str.strip()
+    df['Contracted Date'] = pd.to_datetime(df['Contracted Date'], errors='coerce')
+    df['Lead Creation Date'] = pd.to_datetime(df['Lead Creation Date'], errors='coerce')
+    df['Time to Contract'] = (df['Contracted Date'] - df['Lead Creation Date']).dt.days
+    df['Commission Ratio'] = pd.to_numeric(df['Commission Ratio'], errors='coerce')
+    df['Sales Volume'] = pd.to_numeric(df['Sales Volume'], errors='coerce')
+    return df
+
+
+def _prepare_agents(df):
+    df.fillna(0, inplace=True)
+    df['Conversion Rate'] = (df['Number of Prime TCRs'] + df['Number of Resale TCRs']) / df['Number of Leads Handled'] * 100
+    df['Total_TCRs'] = df['Number of Prime TCRs'] + df['Number of Resale TCRs']
+    return df
+
+
+def _prepare_contacts(df):
+    # Day-first timestamps, with or without milliseconds
+    df['Contact Creation Date'] = pd.to_datetime(df['Contact Creation Date'], dayfirst=True, format='mixed', errors='coerce')
+    return df
+
+
+register_dataset('leads', './data/Leads_Info.xlsx', _prepare_leads)
+register_dataset('transactions', './data/Prime_TCR.xls', _prepare_transactions)
+register_dataset('agents', './data/Agents Info.xlsx', _prepare_agents)
+register_dataset('contacts', './data/Contact_With_Comments.csv', _prepare_contacts)
@@ -0,0 +1,88 @@
+# utils/date_index.py
+
+import numpy as np
+import pandas as pd
+
+# Missing dates sort after every real one, so no date range reaches them
+_NAT = np.iinfo(np.int64).max
+
+
+class DateIndex:
+    # Row positions sorted by date (within each group, when `groups` is
+    # given), with prefix sums of numeric columns in that order. A date range
+    # is two searchsorted calls per group, its rows a slice of the order, and
+    # a sum or count over it a difference of two prefix sums, so range KPIs
+    # cost O(log n) per group. With days=True the range bounds are whole
+    # days, the end day included.
+
+    def __init__(self, dates, values=None, groups=None, days=False):
+        self.days = days
+        stamps = pd.DatetimeIndex(dates).as_unit('ns').asi8.copy()
+        stamps[stamps == np.iinfo(np.int64).min] = _NAT
+
+        if groups is None:
+            group_codes, self.groups = np.zeros(len(stamps), dtype=np.int64), pd.Index([None])
+        else:
+            group_codes, self.groups = pd.factorize(np.asarray(groups, dtype=object))
+            # Rows without a group only show up when no groups are selected
+            group_codes = np.where(group_codes < 0, len(self.groups), group_codes)
+        self._group = {group: code for code, group in enumerate(self.groups)}
+
+        self.order = np.lexsort((stamps, group_codes))
+        self.stamps = stamps[self.order]
+        self._bounds = np.searchsorted(group_codes[self.order], np.arange(len(self.groups) + 2))
+
+        # Prefix sums of each column (missing values as 0) and of its present values
+        self._sums, self._counts = {}, {}
+        for column, column_values in (values or {}).items():
+            column_values = np.asarray(column_values, dtype=float)[self.order]
+            present = ~np.isnan(column_values)
+            self._sums[column] = np.concatenate([[0.0], np.cumsum(np.where(present, column_values, 0.0))])
+            self._counts[column] = np.concatenate([[0], np.cumsum(present)])
+
+    def _segments(self, groups):
+        # Dates are sorted within each group, so every group is its own segment
+        if not groups:
+            codes = range(len(self.groups) + 1)
+        else:
+            codes = sorted({self._group[group] for group in groups if group in self._group})
+        return [(self._bounds[code], self._bounds[code + 1]) for code in codes]
+
+    def spans(self, start=None, end=None, groups=None):
+        # (lo, hi) slices of the sorted order holding the matching rows
+        if start is None and end is None:
+            return self._segments(groups)
+        # Either bound leaves out the rows without a date
+        if start is None:
+            start = np.iinfo(np.int64).min
+        else:
+            start = pd.Timestamp(start)
+            start = (start.normalize() if self.days else start).value
+        if end is None:
+            end = _NAT - 1
+        else:
+            end = pd.Timestamp(end)
+            end = (end.normalize() + pd.Timedelta(days=1)).value - 1 if self.days else end.value
+        spans = []
+        for lo, hi in self._segments(groups):
+            segment = self.stamps[lo:hi]
+            first = lo + np.searchsorted(segment, start, 'left')
+            last = lo + np.searchsorted(segment, end, 'right')
+            spans.append((first, max(first, last)))
+        return spans
+
+    def positions(self, start=None, end=None, groups=None):
+        # Matching row positions, ascending
+        spans = self.spans(start, end, groups)
+        return np.sort(np.concatenate([self.order[lo:hi] for lo, hi in spans] + [np.zeros(0, dtype=np.int64)]))
+
+    def size(self, start=None, end=None, groups=None):
+        return int(sum(hi - lo for lo, hi in self.spans(start, end, groups)))
+
+    def total(self, column, start=None, end=None, groups=None):
+        sums = self._sums[column]
+        return float(sum(sums[hi] - sums[lo] for lo, hi in self.spans(start, end, groups)))
+
+    def count(self, column, start=None, end=None, groups=None):
+        counts = self._counts[column]
+        return int(sum(counts[hi] - counts[lo] for lo, hi in self.spans(start, end, groups)))
@@ -0,0 +1,90 @@
+# utils/district_stats.py
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = ['District Name', 'Lead Count', 'Avg Budget', 'Total Budget', 'Most Common Property',
+                 'Primary Business', 'Days Since Last Lead']
+
+# Categorical columns summarized by their most common value per district
+MODE_COLUMNS = {'Property Type': 'Most Common Property', 'Line of Business': 'Primary Business'}
+
+
+class DistrictStats:
+    # Per-district lead statistics kept as additive partial aggregates (counts,
+    # sums, maxima and per-value counts), so new leads can be folded in with
+    # update() without revisiting the rows already seen. Modes break ties by
+    # first occurrence, like value_counts().index[0].
+
+    def __init__(self, leads=None):
+        self.rows_seen = 0
+        self._totals = None  # district -> leads, budget sum, budget count, last lead
+        self._values = {column: None for column in MODE_COLUMNS}  # (district, value) -> count, first row
+        if leads is not None:
+            self.update(leads)
+
+    def update(self, leads):
+        # Everything below works on integer codes; rows without a district are
+        # dropped through their -1 code rather than by filtering the frame
+        codes, districts = pd.factorize(leads['District Name'])
+        keep = codes >= 0
+        codes = codes[keep]
+        position = np.arange(self.rows_seen, self.rows_seen + len(leads))[keep]
+        self.rows_seen += len(leads)
+        if not len(codes):
+            return self
+
+        n = len(districts)
+        budget = leads['Budget From'].to_numpy()[keep]
+        has_budget = ~pd.isna(budget)
+        last_lead = pd.Series(leads['Creation Date'].to_numpy()[keep]).groupby(codes).max()
+        totals = pd.DataFrame({
+            'leads': np.bincount(codes, weights=leads['Lead ID'].notna().to_numpy()[keep], minlength=n).astype('int64'),
+            'budget_sum': pd.Series(budget).groupby(codes).sum().reindex(range(n)).to_numpy(),
+            'budget_count': np.bincount(codes, weights=has_budget, minlength=n).astype('int64'),
+            'last_lead': last_lead.reindex(range(n)).to_numpy(),
+        }, index=districts)
+        self._totals = totals if self._totals is None else pd.concat([self._totals, totals]).groupby(level=0).agg(
+            {'leads': 'sum', 'budget_sum': 'sum', 'budget_count': 'sum', 'last_lead': 'max'})
+
+        for column in MODE_COLUMNS:
+            value_codes, value_labels = pd.factorize(leads[column].to_numpy()[keep])
+            has_value = value_codes >= 0
+            # One integer per (district, value) pair
+            pair_codes = codes[has_value] * len(value_labels) + value_codes[has_value]
+            pairs, first, counts = np.unique(pair_codes, return_index=True, return_counts=True)
+            index = pd.MultiIndex.from_arrays([districts[pairs // len(value_labels)],
+                                               value_labels[pairs % len(value_labels)]])
+            values = pd.DataFrame({'count': counts, 'first': position[has_value][first]}, index=index)
+            if self._values[column] is not None:
+                values = pd.concat([self._values[column], values]).groupby(level=[0, 1]).agg(
+                    {'count': 'sum', 'first': 'min'})
+            self._values[column] = values
+        return self
+
+    def _modes(self, column):
+        values = self._values[column]
+        if values is None or values.empty:
+            return pd.Series(dtype=object)
+        # Highest count wins; among equal counts the value seen first
+        ranked = values.sort_values(['count', 'first'], ascending=[False, True], kind='stable')
+        ranked = ranked[~ranked.index.get_level_values(0).duplicated()]
+        return pd.Series(ranked.index.get_level_values(1), index=ranked.index.get_level_values(0))
+
+    def frame(self, now=None):
+        if self._totals is None:
+            return pd.DataFrame(columns=STATS_COLUMNS)
+        now = datetime.now() if now is None else now
+        totals = self._totals.sort_index()
+        stats = pd.DataFrame({
+            'Lead Count': totals['leads'],
+            'Avg Budget': totals['budget_sum'] / totals['budget_count'],
+            'Total Budget': totals['budget_sum'],
+        })
+        for column, name in MODE_COLUMNS.items():
+            stats[name] = self._modes(column).reindex(stats.index).fillna('Unknown')
+        stats['Days Since Last Lead'] = (pd.Timestamp(now) - totals['last_lead']).dt.days
+        stats.index.name = 'District Name'
+        return stats.round(2).reset_index()
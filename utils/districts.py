@@ -0,0 +1,73 @@
+# utils/districts.py
+
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Expanded district name mapping
+district_mapping = {
+    'new cairo': ['new cairo', 'new cairo city', 'cairo new', 'tagamoa', 'tagammoa', 'el tagamoa', 'al tagamoa'],
+    'maadi': ['maadi', 'el maadi', 'al maadi', 'madi', 'el madi'],
+    'nasr city': ['nasr city', 'nasr', 'nasrcity', 'madinet nasr', 'madinat nasr'],
+    'heliopolis': ['heliopolis', 'misr el gedida', 'misr al gedida', 'masr el gedida'],
+    'zamalek': ['zamalek', 'el zamalek', 'al zamalek'],
+    'dokki': ['dokki', 'el dokki', 'al dokki', 'doqi'],
+    'mohandessin': ['mohandessin', 'mohandiseen', 'mohandseen', 'el mohandessin'],
+    'october': ['6th october', 'october', '6 october', 'sixth october'],
+    'sheikh zayed': ['sheikh zayed', 'zayed', 'zayed city', 'el sheikh zayed'],
+    'garden city': ['garden city', 'garden', 'el garden city']
+}
+
+
+# Enhanced district name standardization
+_prefixes = ['el ', 'al ', 'el-', 'al-']
+
+# One lookahead alternative per standard name, in mapping order, so a match at
+# any position reports the highest-priority standard whose variation starts
+# there; the lowest group index over all positions is the mapping's answer
+_variation_pattern = re.compile('(?=(?:' + '|'.join(
+    '(' + '|'.join(re.escape(var) for var in variations) + ')'
+    for variations in district_mapping.values()) + '))')
+_standards = list(district_mapping)
+
+
+def _strip_prefixes(district):
+    district = district.lower().strip()
+    # Remove common prefixes/suffixes
+    for prefix in _prefixes:
+        if district.startswith(prefix):
+            district = district[len(prefix):]
+    return district
+
+
+def _match_standard(district):
+    # Check mapping: first standard with a variation contained in the name
+    groups = [m.lastindex for m in _variation_pattern.finditer(district) if m.lastindex]
+    return _standards[min(groups) - 1] if groups else district
+
+
+# Precompiled reverse lookup for names that are already a known variation
+_reverse_mapping = {var: _match_standard(var) for variations in district_mapping.values() for var in variations}
+
+
+@lru_cache(maxsize=4096)
+def _standardize(district):
+    district = _strip_prefixes(district)
+    standard = _reverse_mapping.get(district)
+    return standard if standard is not None else _match_standard(district)
+
+
+def standardize_district(district):
+    if pd.isna(district):
+        return None
+    return _standardize(district)
+
+
+def standardize_districts(districts):
+    # Series version: standardizes each distinct raw value once and broadcasts
+    # the results back through the factorized codes (-1, i.e. missing, -> None)
+    codes, uniques = pd.factorize(districts)
+    standardized = np.array([_standardize(district) for district in uniques] + [None], dtype=object)
+    return pd.Series(standardized[codes], index=districts.index, name=districts.name)
@@ -0,0 +1,194 @@
+# utils/figure_cache.py
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from plotly.io.json import to_json_plotly
+
+from utils.datasets import dataset_version
+from utils.shared_cache import SharedCache
+from utils.snapshots import SNAPSHOT_DIR
+
+# Byte budget of the in-process figure cache
+FIGURE_CACHE_BYTES = int(os.environ.get('FIGURE_CACHE_BYTES', 64 * 2**20))
+# SQLite file shared by the node's workers; empty to keep results per process
+SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH', os.path.join(SNAPSHOT_DIR, 'results.sqlite'))
+
+
+class FigureCache:
+    # Least recently used serialized callback results, evicted once their
+    # total size passes max_bytes, with hit and eviction counters
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, scope='', fingerprint=''):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, scope, fingerprint):
+        # Keys already carry the fingerprint; stale entries simply age out
+        pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class TieredCache:
+    # The process's own LRU in front of the cache shared between workers; a
+    # shared hit is copied into the local tier
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.put(key, value)
+        return value
+
+    def put(self, key, value, scope='', fingerprint=''):
+        self.local.put(key, value)
+        self.shared.put(key, value, scope, fingerprint)
+
+    def invalidate(self, scope, fingerprint):
+        self.shared.invalidate(scope, fingerprint)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        return {'local': self.local.stats(), 'shared': self.shared.stats()}
+
+
+if SHARED_CACHE_PATH:
+    FIGURE_CACHE = TieredCache(FigureCache(), SharedCache(SHARED_CACHE_PATH))
+else:
+    FIGURE_CACHE = FigureCache()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    # Hash of the app's own sources: results persisted by an older deploy
+    # must not be served once the code that built them has changed
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(root, '*.py')) + glob.glob(os.path.join(root, '*', '*.py'))):
+        digest.update(os.path.relpath(path, root).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _canonical(value, is_date=False):
+    # Equivalent inputs get one key: no selection is None whether it arrives
+    # as None, '' or [], selections are order-free, and dates are ISO
+    # timestamps. Lists of records (e.g. a table's sort_by) keep their order.
+    if value is None or value == '' or value == []:
+        return None
+    if is_date:
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, dict) for item in value):
+            return list(value)
+        return sorted(value, key=str)
+    return value
+
+
+def canonical_args(args, dates=()):
+    return [_canonical(arg, position in dates) for position, arg in enumerate(args)]
+
+
+def callback_scope(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def callback_fingerprint(datasets):
+    # The code and the versions of the datasets a callback's results depend on
+    return ','.join([code_version()] + [dataset_version(name) for name in datasets])
+
+
+def callback_key(func, datasets, args, dates=()):
+    # The callback, the versions of the datasets it reads and its canonical inputs
+    return json.dumps([
+        func.__module__, func.__qualname__,
+        callback_fingerprint(datasets),
+        canonical_args(args, dates),
+    ], default=str)
+
+
+def memoize_callback(*datasets, dates=(), cache=FIGURE_CACHE):
+    # Serve a callback's outputs from `cache` for inputs seen before. `dates`
+    # are the positions of date arguments. Results are stored as the JSON
+    # Dash would send, and a hit returns it parsed, without rebuilding any
+    # figure. Callbacks that raise (e.g. PreventUpdate) are not cached.
+    # The first call under a new code or data fingerprint drops the entries
+    # the callback left in the shared cache under older ones.
+    def decorator(func):
+        scope = callback_scope(func)
+        purged = set()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            fingerprint = callback_fingerprint(datasets)
+            if fingerprint not in purged:
+                purged.add(fingerprint)
+                cache.invalidate(scope, fingerprint)
+            key = callback_key(func, datasets, args, dates)
+            cached = cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+            result = func(*args)
+            cache.put(key, to_json_plotly(result), scope, fingerprint)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,78 @@
+# utils/figure_patch.py
+
+import functools
+
+import numpy as np
+from dash import Patch, ctx
+from dash.exceptions import MissingCallbackContextException
+
+
+def _plain(figure):
+    # Memoized results come back as plain dicts, fresh ones as go.Figure
+    return figure if isinstance(figure, dict) else figure.to_plotly_json()
+
+
+def _is_array(value):
+    # plotly >= 6 encodes numeric arrays as typed-array dicts ({'dtype', 'bdata'})
+    return isinstance(value, (list, tuple, np.ndarray)) or (isinstance(value, dict) and 'bdata' in value)
+
+
+def _assign_arrays(patch, trace):
+    # Patch only the array-valued attributes, at any depth (e.g. marker.size)
+    for key, value in trace.items():
+        if _is_array(value):
+            patch[key] = value
+        elif isinstance(value, dict):
+            _assign_arrays(patch[key], value)
+
+
+def figure_patch(figure, replace_traces=False):
+    # The part of `figure` a filter change can alter, as a Patch of the
+    # figure the browser already has. Layout, template and titles do not
+    # depend on the filters here and are left as sent. Traces keep their
+    # count and settings, so only their data arrays are sent, unless
+    # `replace_traces` (the number of traces follows the data, e.g. one per
+    # colour group), in which case the trace list is replaced.
+    data = _plain(figure).get('data', [])
+    patch = Patch()
+    if replace_traces:
+        patch['data'] = data
+    else:
+        for position, trace in enumerate(data):
+            _assign_arrays(patch['data'][position], trace)
+    return patch
+
+
+def _filter_triggered(filters):
+    # True when only the filters changed, i.e. the browser holds a figure
+    # built by this callback. The initial call, a new page layout and an
+    # opened tab all need the whole figure.
+    try:
+        triggered = ctx.triggered_prop_ids
+    except (MissingCallbackContextException, LookupError):
+        return False
+    return bool(triggered) and all(component in filters for component in triggered.values())
+
+
+def patch_figures(filters, outputs=None, replace_traces=()):
+    # Send a callback's figures as Patches when it was triggered by `filters`
+    # alone (inputs or component ids). `outputs` are the positions of figure
+    # outputs in a multi-output result, None for a single figure output;
+    # `replace_traces` the positions whose traces are replaced whole (for a
+    # single output, whether they are).
+    filters = {getattr(item, 'component_id', item) for item in filters}
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            result = func(*args)
+            if not _filter_triggered(filters):
+                return result
+            if outputs is None:
+                return figure_patch(result, replace_traces=bool(replace_traces))
+            result = list(result)
+            for position in outputs:
+                result[position] = figure_patch(result[position], replace_traces=position in replace_traces)
+            return result
+        return wrapper
+    return decorator
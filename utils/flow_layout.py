@@ -0,0 +1,138 @@
+# utils/flow_layout.py
+
+import hashlib
+import os
+import pickle
+from collections import deque
+
+import networkx as nx
+import numpy as np
+
+from utils.snapshots import SNAPSHOT_DIR, remove_stale, write_atomic
+
+# Bump when the layout or trace arrays change so cached layouts are ignored
+FLOW_LAYOUT_VERSION = 1
+
+FLOW_LAYOUT_STEM = 'flow_layout'
+
+
+def node_levels(G):
+    # Level of every node: its hop distance from the nearest start node (no
+    # incoming edges), found with one multi-source BFS. Nodes no start node
+    # reaches go one level past the deepest reached node.
+    start_nodes = [node for node in G.nodes() if G.in_degree(node) == 0]
+    if not start_nodes and len(G):
+        start_nodes = [next(iter(G.nodes()))]  # Fallback if no clear start
+
+    levels = {node: 0 for node in start_nodes}
+    queue = deque(start_nodes)
+    while queue:
+        node = queue.popleft()
+        for successor in G.successors(node):
+            if successor not in levels:
+                levels[successor] = levels[node] + 1
+                queue.append(successor)
+
+    max_level = max(levels.values()) if levels else 0
+    for node in G.nodes():
+        if node not in levels:
+            levels[node] = max_level + 1
+    return levels
+
+
+def _layout_key(transition_counts):
+    # Edge order decides node order and so the layout, hence it is hashed too
+    key = hashlib.sha1()
+    key.update(str(FLOW_LAYOUT_VERSION).encode())
+    for column in ['source', 'target', 'count']:
+        key.update('\x00'.join(map(str, transition_counts[column])).encode())
+        key.update(b'\x01')
+    return key.hexdigest()[:16]
+
+
+def _compute_flow_layout(transition_counts):
+    # Create a NetworkX graph for the flow diagram
+    G = nx.DiGraph()
+    G.add_weighted_edges_from(zip(transition_counts['source'], transition_counts['target'],
+                                  transition_counts['count']))
+
+    # Explicitly add subset attribute to nodes
+    nx.set_node_attributes(G, node_levels(G), 'subset')
+
+    # Calculate node statistics
+    incoming = dict(G.in_degree(weight='weight'))
+    outgoing = dict(G.out_degree(weight='weight'))
+
+    # Use multipartite_layout with explicit subset attribute
+    pos = nx.multipartite_layout(G, subset_key='subset', scale=2.0) if len(G) else {}
+
+    # Edge traces
+    edge_x = []
+    edge_y = []
+    edge_texts = []
+    for source, target, weight in G.edges(data='weight'):
+        x0, y0 = pos[source]
+        x1, y1 = pos[target]
+        edge_x.extend([x0, x1, None])
+        edge_y.extend([y0, y1, None])
+        edge_texts.append(f"From {source} to {target}<br>Count: {weight}")
+
+    # Node traces
+    node_x = []
+    node_y = []
+    node_texts = []
+    node_sizes = []
+    for node in G.nodes():
+        x, y = pos[node]
+        node_x.append(x)
+        node_y.append(y)
+        node_texts.append(
+            f"Stage: {node}<br>"
+            f"Incoming contacts: {incoming[node]}<br>"
+            f"Outgoing contacts: {outgoing[node]}<br>"
+            f"Total flow: {incoming[node] + outgoing[node]}"
+        )
+        node_sizes.append(np.sqrt(incoming[node] + outgoing[node]) * 10)
+
+    return {
+        'edge_x': edge_x,
+        'edge_y': edge_y,
+        'edge_texts': edge_texts,
+        'node_x': node_x,
+        'node_y': node_y,
+        'node_texts': node_texts,
+        'node_sizes': node_sizes,
+    }
+
+
+def flow_layout(transition_counts, cache=True):
+    # Network diagram positions and trace arrays for a set of transition
+    # counts. They are cached on disk next to the data snapshots, keyed by a
+    # hash of the counts, so a restart or data refresh that leaves the graph
+    # unchanged skips the layout entirely. cache=False computes them without
+    # touching the cache (e.g. for one-off filtered views).
+    if not cache:
+        return _compute_flow_layout(transition_counts)
+
+    target = os.path.join(SNAPSHOT_DIR, f"{FLOW_LAYOUT_STEM}-{_layout_key(transition_counts)}.pkl")
+    if os.path.exists(target):
+        try:
+            with open(target, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            # Corrupt or unreadable cache entry, recompute it
+            pass
+
+    layout = _compute_flow_layout(transition_counts)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+
+        def write(path):
+            with open(path, 'wb') as f:
+                pickle.dump(layout, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        write_atomic(target, write)
+        remove_stale(FLOW_LAYOUT_STEM, {os.path.basename(target)})
+    except OSError as e:
+        print(f"Could not cache flow layout: {e}")
+    return layout
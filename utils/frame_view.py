@@ -0,0 +1,42 @@
+# utils/frame_view.py
+
+import numpy as np
+
+
+class FrameView:
+    # A filtered view of a shared read-only frame: just the base frame and the
+    # positions of the selected rows (None for all of them). Filters narrow the
+    # positions, and only the columns a chart asks for are ever taken out of
+    # the base frame, so a request never copies the whole frame.
+
+    def __init__(self, base, positions=None):
+        self.base = base
+        self.positions = None if positions is None else np.asarray(positions, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.base) if self.positions is None else len(self.positions)
+
+    def take(self, positions):
+        # Narrow the view to `positions`, relative to the view's own rows
+        positions = np.asarray(positions, dtype=np.int64)
+        return FrameView(self.base, positions if self.positions is None else self.positions[positions])
+
+    def where(self, mask):
+        return self.take(np.flatnonzero(mask))
+
+    def within(self, positions):
+        # Keep the rows whose base positions are in sorted `positions`
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.positions is None:
+            return FrameView(self.base, positions)
+        return FrameView(self.base, self.positions[np.isin(self.positions, positions, assume_unique=True)])
+
+    def column(self, name):
+        column = self.base[name]
+        return column if self.positions is None else column.iloc[self.positions]
+
+    def frame(self, columns):
+        # The selected rows of `columns`, in one take from the base frame
+        if self.positions is None:
+            return self.base[columns]
+        return self.base.iloc[self.positions, self.base.columns.get_indexer(columns)]
@@ -0,0 +1,170 @@
+# utils/geocode_cache.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import sha1
+
+import geopandas as gpd
+import osmnx as ox
+import requests
+
+from utils.snapshots import write_atomic
+
+# How long a failed lookup is trusted before it is worth asking Nominatim again
+NEGATIVE_TTL = float(os.environ.get('GEOCODE_NEGATIVE_TTL', 7 * 24 * 3600))
+# Failed lookups that left no response file, with when they failed
+NEGATIVE_FILE = 'negative_lookups.json'
+
+HIT = 'hit'
+MISS = 'miss'
+UNKNOWN = 'unknown'
+
+
+def normalize_query(query):
+    # Nominatim ignores case and repeated whitespace, so these share an entry
+    return ' '.join(query.split()).casefold()
+
+
+def nominatim_cache_key(query, limit=50):
+    # Reproduces the request osmnx.geocode_to_gdf sends (auto-selecting the
+    # first polygon among up to 50 results), so cached files can be found by
+    # query text
+    params = OrderedDict()
+    params['format'] = 'json'
+    params['polygon_geojson'] = 1
+    params['dedupe'] = 0
+    params['limit'] = limit
+    params['q'] = query
+    url = ox.settings.nominatim_url.rstrip('/') + '/search'
+    prepared_url = str(requests.Request('GET', url, params=params).prepare().url)
+    return sha1(prepared_url.encode('utf-8')).hexdigest()
+
+
+def results_to_gdf(results):
+    # Same selection and columns as osmnx.geocode_to_gdf: the most important
+    # (Multi)Polygon result, or None when there is none
+    results = sorted(results, key=lambda x: x.get('importance', 0), reverse=True)
+    result = next((r for r in results if r.get('geojson', {}).get('type') in {'Polygon', 'MultiPolygon'}), None)
+    if result is None:
+        return None
+
+    bottom, top, left, right = result['boundingbox']
+    properties = {'bbox_west': left, 'bbox_south': bottom, 'bbox_east': right, 'bbox_north': top}
+    for attr in result:
+        if attr not in {'address', 'boundingbox', 'geojson', 'icon', 'licence'}:
+            properties[attr] = result[attr]
+    gdf = gpd.GeoDataFrame.from_features([{'type': 'Feature', 'geometry': result['geojson'], 'properties': properties}],
+                                         crs='epsg:4326')
+    cols = ['lat', 'lon', 'bbox_north', 'bbox_south', 'bbox_east', 'bbox_west']
+    gdf[cols] = gdf[cols].astype(float)
+    return gdf
+
+
+class GeocodeCache:
+    # In-memory index over osmnx's response cache (one <sha1 of request
+    # URL>.json file per request, in ox.settings.cache_folder). Lookups answer
+    # HIT (with the district GeoDataFrame), MISS or UNKNOWN (worth a live
+    # request). A response file is final either way, since osmnx would answer
+    # the same request from that file; only failures that left no file (kept
+    # in NEGATIVE_FILE with their own time) expire after negative_ttl.
+
+    def __init__(self, cache_dir=None, negative_ttl=NEGATIVE_TTL):
+        cache_dir = str(ox.settings.cache_folder) if cache_dir is None else cache_dir
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._index = {}  # normalized query -> (gdf or None, failed at or None for a response file)
+        self._negative_path = os.path.join(cache_dir, NEGATIVE_FILE)
+        self._negatives = {}  # normalized query -> failed at
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+
+        try:
+            with open(self._negative_path, encoding='utf-8') as f:
+                self._negatives = {key: float(failed_at) for key, failed_at in json.load(f).items()}
+        except (OSError, ValueError, AttributeError, TypeError):
+            pass
+
+        # Raw responses by file digest
+        self._responses = {}
+        if os.path.isdir(cache_dir):
+            for name in os.listdir(cache_dir):
+                if not name.endswith('.json') or name == NEGATIVE_FILE:
+                    continue
+                path = os.path.join(cache_dir, name)
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        response = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if isinstance(response, list):
+                    self._responses[name[:-5]] = response
+
+    def _resolve(self, query):
+        key = normalize_query(query)
+        entry = self._index.get(key)
+        if entry is None:
+            response = self._responses.get(nominatim_cache_key(query))
+            if response is not None:
+                entry = (results_to_gdf(response), None)
+                self._index[key] = entry
+            elif key in self._negatives:
+                entry = (None, self._negatives[key])
+        return entry
+
+    def get(self, query):
+        with self._lock:
+            entry = self._resolve(query)
+            if entry is not None:
+                gdf, recorded_at = entry
+                if gdf is not None:
+                    self.hits += 1
+                    return HIT, gdf.copy()
+                if recorded_at is None or time.time() - recorded_at < self.negative_ttl:
+                    self.misses += 1
+                    return MISS, None
+            self.unknown += 1
+            return UNKNOWN, None
+
+    def _save_negatives(self):
+        negatives = dict(self._negatives)
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(negatives, f)
+        try:
+            os.makedirs(os.path.dirname(self._negative_path), exist_ok=True)
+            write_atomic(self._negative_path, write)
+        except OSError as e:
+            print(f"Could not save failed geocode lookups: {e}")
+
+    def record_hit(self, query, gdf):
+        key = normalize_query(query)
+        with self._lock:
+            self._index[key] = (gdf.copy(), None)
+            if self._negatives.pop(key, None) is not None:
+                self._save_negatives()
+
+    def record_miss(self, query):
+        key = normalize_query(query)
+        with self._lock:
+            self._negatives[key] = failed_at = time.time()
+            self._index[key] = (None, failed_at)
+            self._save_negatives()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.unknown
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'unknown': self.unknown,
+            'answered_rate': (self.hits + self.misses) / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_geocode_cache():
+    return GeocodeCache()
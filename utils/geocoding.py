@@ -0,0 +1,130 @@
+# utils/geocoding.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import geopandas as gpd
+import osmnx as ox
+import pandas as pd
+import requests
+from osmnx import _errors as ox_errors
+
+from utils.geocode_cache import GeocodeCache, get_geocode_cache, HIT, MISS
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_RATE = 1.0
+
+# Failures worth retrying: the network, or Nominatim answering with an error
+# status (osmnx 2.x raises ResponseStatusCodeError for those)
+TRANSIENT_ERRORS = (requests.RequestException, ConnectionError, TimeoutError) + tuple(
+    getattr(ox_errors, name) for name in ['ResponseStatusCodeError'] if hasattr(ox_errors, name))
+# Definitive answers without a (Multi)Polygon: no results, or none of them a
+# polygon (osmnx raises TypeError for the latter)
+NO_POLYGON_ERRORS = (getattr(ox_errors, 'InsufficientResponseError', ValueError), TypeError)
+
+
+class TokenBucket:
+    # Thread-safe token bucket: acquire() blocks until a token is available,
+    # so at most `rate` requests per second leave the process on average,
+    # with bursts of up to `capacity`
+
+    def __init__(self, rate=NOMINATIM_RATE, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class FixtureGeocoder:
+    # Offline stand-in for ox.geocode_to_gdf that answers from the response
+    # files of a cache folder, so the pipeline can run without network access
+
+    def __init__(self, cache_dir=None):
+        self.cache = GeocodeCache(cache_dir, negative_ttl=float('inf'))
+        self.calls = 0
+
+    def __call__(self, place):
+        self.calls += 1
+        status, gdf = self.cache.get(place)
+        if status != HIT:
+            raise LookupError(f"No (Multi)Polygon fixture for query {place!r}")
+        return gdf
+
+
+def place_variations(district):
+    # Expanded search variations, most specific first
+    return [
+        f"{district.upper()}, Cairo, Egypt",
+        f"{district.upper()} District, Cairo, Egypt",
+        f"{district.upper()}, Egypt",
+        f"District {district.upper()}, Cairo",
+        f"{district.title()}, Greater Cairo"
+    ]
+
+
+def _resolve_district(district, geocoder, cache, bucket, max_retries):
+    # First successful place variation wins. Transient errors are retried;
+    # only an answer without a polygon is remembered as a miss.
+    for attempt in range(max_retries):
+        transient_error = None
+        for place in place_variations(district):
+            status, gdf = cache.get(place)
+            if status == MISS:
+                continue
+            if status != HIT:
+                bucket.acquire()
+                try:
+                    gdf = geocoder(place)
+                except TRANSIENT_ERRORS as e:
+                    transient_error = e
+                    continue
+                except NO_POLYGON_ERRORS:
+                    cache.record_miss(place)
+                    continue
+                except Exception:
+                    continue
+                cache.record_hit(place, gdf)
+            if gdf is not None and not gdf.empty:
+                gdf = gdf.copy()
+                gdf['district_name'] = district
+                return gdf
+        if transient_error is None:
+            break
+    return None
+
+
+def geocode_districts(districts, geocoder=None, cache=None, max_workers=4, rate=NOMINATIM_RATE, max_retries=3):
+    # Geocode districts concurrently behind a shared rate limiter. Returns a
+    # GeoDataFrame built once from every resolved district, plus the names
+    # that could not be resolved.
+    geocoder = ox.geocode_to_gdf if geocoder is None else geocoder
+    cache = get_geocode_cache() if cache is None else cache
+    bucket = TokenBucket(rate)
+    districts = list(districts)
+
+    if districts:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='geocode') as executor:
+            results = list(executor.map(
+                lambda district: _resolve_district(district, geocoder, cache, bucket, max_retries), districts))
+    else:
+        results = []
+
+    found = [gdf for gdf in results if gdf is not None]
+    failed = [district for district, gdf in zip(districts, results) if gdf is None]
+    if not found:
+        return gpd.GeoDataFrame({'district_name': []}, geometry=[], crs='epsg:4326'), failed
+    return gpd.GeoDataFrame(pd.concat(found, ignore_index=True), crs='epsg:4326'), failed
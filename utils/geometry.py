@@ -0,0 +1,126 @@
+# utils/geometry.py
+
+import struct
+from functools import lru_cache
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from utils.districts import standardize_district
+
+DISTRICT_SHAPEFILE = './data/District_region.shp'
+
+# Shapefile shape types that carry polygons (plain, Z and M variants)
+POLYGON_SHAPE_TYPES = (5, 15, 25)
+
+# Representative (lon, lat) point for each standardized district name. The
+# shapefile only ships geometry, so names are tied to polygons by the polygon
+# that contains the point. Names whose point falls outside every polygon
+# (the newer desert cities are not in the shapefile) are left unmatched.
+DISTRICT_ANCHORS = {
+    'new cairo': (31.4700, 30.0300),
+    'maadi': (31.2569, 29.9602),
+    'nasr city': (31.3300, 30.0561),
+    'heliopolis': (31.3220, 30.0911),
+    'zamalek': (31.2197, 30.0609),
+    'dokki': (31.2122, 30.0385),
+    'mohandessin': (31.2003, 30.0566),
+    'october': (30.9278, 29.9737),
+    'sheikh zayed': (30.9830, 30.0440),
+    'garden city': (31.2310, 30.0366),
+    'mostakbal city': (31.6330, 30.1300),
+    'new capital': (31.7600, 30.0200),
+    'north coast': (28.9550, 30.8300),
+}
+
+
+def read_polygon_shapefile(path):
+    # Minimal reader for the geometry (.shp) part of a shapefile. The repo only
+    # ships District_region.shp, without the .shx/.dbf/.prj companions GDAL
+    # needs to open it, so the records are decoded directly.
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    geometries = []
+    offset = 100  # fixed-size file header
+    while offset < len(content):
+        _, length = struct.unpack('>ii', content[offset:offset + 8])
+        record = content[offset + 8:offset + 8 + length * 2]
+        offset += 8 + length * 2
+
+        shape_type = struct.unpack('<i', record[:4])[0]
+        if shape_type not in POLYGON_SHAPE_TYPES:
+            geometries.append(None)
+            continue
+
+        num_parts, num_points = struct.unpack('<ii', record[36:44])
+        parts = np.frombuffer(record, '<i4', num_parts, 44)
+        points = np.frombuffer(record, '<f8', 2 * num_points, 44 + 4 * num_parts).reshape(-1, 2)
+        bounds = list(parts) + [num_points]
+        rings = [points[bounds[i]:bounds[i + 1]] for i in range(num_parts)]
+
+        # Outer rings are clockwise, holes counter-clockwise
+        shells, holes = [], []
+        for ring in rings:
+            (holes if shapely.is_ccw(shapely.linearrings(ring)) else shells).append(ring)
+        shell_holes = [[] for _ in shells]
+        for hole in holes:
+            for i, shell in enumerate(shells):
+                if shapely.Polygon(shell).contains(shapely.Point(hole[0])):
+                    shell_holes[i].append(hole)
+                    break
+
+        polygons = [shapely.Polygon(shell, shell_holes[i]) for i, shell in enumerate(shells)]
+        if not polygons:
+            geometries.append(None)
+        elif len(polygons) == 1:
+            geometries.append(polygons[0])
+        else:
+            geometries.append(shapely.MultiPolygon(polygons))
+
+    return geometries
+
+
+class DistrictGeometryProvider:
+    # Resolves district names to polygons from the local shapefile, using an
+    # STR-tree over the polygons so no network access is needed
+
+    def __init__(self, path=DISTRICT_SHAPEFILE, anchors=None):
+        anchors = DISTRICT_ANCHORS if anchors is None else anchors
+        self.geometries = np.array(read_polygon_shapefile(path), dtype=object)
+        self.tree = STRtree(self.geometries)
+
+        # Resolve every anchor with one bulk spatial query; when polygons
+        # overlap keep the smallest, most specific one
+        names = list(anchors)
+        points = shapely.points(np.array([anchors[name] for name in names]).reshape(-1, 2))
+        point_idx, geometry_idx = self.tree.query(points, predicate='intersects')
+        areas = shapely.area(self.geometries[geometry_idx])
+        self.index = {}
+        for i in np.lexsort((areas, point_idx)):
+            self.index.setdefault(names[point_idx[i]], int(geometry_idx[i]))
+
+    def resolve(self, district):
+        position = self.index.get(standardize_district(district))
+        return None if position is None else self.geometries[position]
+
+    def to_gdf(self, districts):
+        # GeoDataFrame of the districts found in the shapefile, plus the list
+        # of names that could not be matched
+        names, geometries, unmatched = [], [], []
+        for district in districts:
+            geometry = self.resolve(district)
+            if geometry is None:
+                unmatched.append(district)
+            else:
+                names.append(district)
+                geometries.append(geometry)
+        gdf = gpd.GeoDataFrame({'district_name': names}, geometry=geometries, crs='EPSG:4326')
+        return gdf, unmatched
+
+
+@lru_cache(maxsize=None)
+def get_district_geometry_provider():
+    return DistrictGeometryProvider()
@@ -0,0 +1,66 @@
+# utils/lead_cube.py
+
+import numpy as np
+import pandas as pd
+
+# Cube dimensions besides the creation day
+CUBE_DIMENSIONS = ['Lead Source', 'Lead Status', 'District Name', 'Property Type']
+
+# Lead columns the cube reads
+CUBE_COLUMNS = CUBE_DIMENSIONS + ['Creation Date', 'Budget From']
+
+
+class LeadCube:
+    # Lead counts and budget sums per (source, status, district, property
+    # type, creation day) cell. Filters and chart aggregates work on the cells
+    # only, so their cost depends on the number of distinct combinations, not
+    # on the number of leads. Dates are matched by whole day.
+
+    def __init__(self, leads):
+        cells = pd.DataFrame({column: leads[column].to_numpy() for column in CUBE_DIMENSIONS})
+        cells['Day'] = leads['Creation Date'].dt.normalize().to_numpy()
+        cells['budget'] = leads['Budget From'].to_numpy()
+        cells['position'] = np.arange(len(leads))
+        # Missing keys are cells too: charts drop them per dimension, as the
+        # row-level groupbys did
+        self.cells = cells.groupby(CUBE_DIMENSIONS + ['Day'], dropna=False, sort=False).agg(
+            count=('position', 'size'),
+            budget_sum=('budget', 'sum'),
+            budget_count=('budget', 'count'),
+            first=('position', 'min'),
+        ).reset_index()
+
+    def select(self, statuses=None, sources=None, start_date=None, end_date=None):
+        # Cells matching the filters
+        mask = np.ones(len(self.cells), dtype=bool)
+        if statuses:
+            mask &= self.cells['Lead Status'].isin(statuses).to_numpy()
+        if sources:
+            mask &= self.cells['Lead Source'].isin(sources).to_numpy()
+        if start_date:
+            mask &= (self.cells['Day'] >= pd.Timestamp(start_date).normalize()).to_numpy()
+        if end_date:
+            mask &= (self.cells['Day'] <= pd.Timestamp(end_date).normalize()).to_numpy()
+        return mask
+
+    def query(self, statuses=None, sources=None, start_date=None, end_date=None):
+        cells = self.cells[self.select(statuses, sources, start_date, end_date)]
+
+        # Average budget per (property type, status), like pivot_table(aggfunc='mean')
+        budgets = cells.groupby(['Property Type', 'Lead Status'])[['budget_sum', 'budget_count']].sum()
+        budget_heatmap = (budgets['budget_sum'] / budgets['budget_count'].where(budgets['budget_count'] > 0))
+        budget_heatmap = budget_heatmap.unstack('Lead Status').dropna(how='all')
+
+        # Statuses by count; ties keep the order they first appear in, like value_counts()
+        statuses = cells.groupby('Lead Status').agg(count=('count', 'sum'), first=('first', 'min'))
+        statuses = statuses.sort_values(['count', 'first'], ascending=[False, True], kind='stable')
+
+        daily = cells.groupby('Day')['count'].sum()
+        return {
+            'source_status': cells.groupby(['Lead Source', 'Lead Status'])['count'].sum().reset_index(),
+            'budget_heatmap': budget_heatmap,
+            'district_property': cells.groupby(['District Name', 'Property Type'])['count'].sum().reset_index(),
+            'status_counts': pd.DataFrame({'Stage': statuses.index.to_numpy(),
+                                           'Number of Leads': statuses['count'].to_numpy()}),
+            'daily_counts': pd.DataFrame({'Date': daily.index.date, 'Leads': daily.to_numpy()}),
+        }
@@ -0,0 +1,58 @@
+# utils/ngram_index.py
+
+import numpy as np
+import pandas as pd
+
+GRAM = 3
+
+
+def _normalize(text):
+    return text.lower() if isinstance(text, str) else ''
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TrigramIndex:
+    # Case-insensitive substring search over a text column. Every trigram of
+    # the lower-cased values maps to the sorted positions of the rows holding
+    # it. A query intersects the posting lists of its own trigrams, shortest
+    # first, and only those candidates are checked for the full substring.
+    # Queries shorter than a trigram fall back to a scan. Missing values
+    # never match.
+
+    def __init__(self, values):
+        self.values = [_normalize(value) for value in values]
+        grams, owners = [], []
+        for position, value in enumerate(self.values):
+            value_grams = _grams(value)
+            grams.extend(value_grams)
+            owners.extend([position] * len(value_grams))
+
+        codes, labels = pd.factorize(np.array(grams, dtype=object))
+        # Stable, so each posting list stays in row order
+        order = np.argsort(codes, kind='stable')
+        self._postings = np.array(owners, dtype=np.int64)[order]
+        self._bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        self._codes = {gram: code for code, gram in enumerate(labels)}
+
+    def postings(self, gram):
+        code = self._codes.get(gram)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return self._postings[self._bounds[code]:self._bounds[code + 1]]
+
+    def search(self, query):
+        # Ascending positions of the rows containing `query`
+        query = _normalize(query)
+        if len(query) < GRAM:
+            return np.array([position for position, value in enumerate(self.values) if query in value],
+                            dtype=np.int64)
+        lists = sorted((self.postings(gram) for gram in _grams(query)), key=len)
+        candidates = lists[0]
+        for postings in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+        return np.array([position for position in candidates if query in self.values[position]], dtype=np.int64)
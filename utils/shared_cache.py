@@ -0,0 +1,133 @@
+# utils/shared_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+
+# Byte budget of the shared cache file's entries
+SHARED_CACHE_BYTES = int(os.environ.get('SHARED_CACHE_BYTES', 512 * 2**20))
+# Seconds a hit leaves an entry's access time alone: a hit only writes (and
+# takes SQLite's single writer lock) when its entry was last touched earlier
+TOUCH_INTERVAL = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE INDEX IF NOT EXISTS results_scope ON results (scope, fingerprint);
+"""
+
+
+class SharedCache:
+    # Serialized results in a local SQLite file that every worker process on
+    # the node opens, so a result computed by one worker is served by all.
+    # WAL mode lets readers run alongside a writer; each write, and the
+    # least-recently-used eviction that keeps the file under max_bytes, is
+    # one transaction. Entries carry the fingerprint of the data they were
+    # computed from, and invalidate() drops a scope's entries of any other
+    # fingerprint. Cache errors are reported and treated as misses, never
+    # passed on to the callback.
+
+    def __init__(self, path, max_bytes=SHARED_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.errors = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _failed(self, action, error):
+        self._count('errors')
+        print(f"Shared cache {action} failed: {error}")
+
+    def get(self, key):
+        try:
+            connection = self._connection()
+            row = connection.execute('SELECT value, accessed FROM results WHERE key = ?', (key,)).fetchone()
+            now = time.time()
+            if row is not None and now - row[1] >= TOUCH_INTERVAL:
+                connection.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            self._failed('read', e)
+            return None
+        self._count('misses' if row is None else 'hits')
+        return None if row is None else row[0].decode() if isinstance(row[0], bytes) else row[0]
+
+    def put(self, key, value, scope='', fingerprint=''):
+        value = value.encode() if isinstance(value, str) else value
+        if len(value) > self.max_bytes:
+            return
+        try:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                                   (key, scope, fingerprint, value, len(value), time.time()))
+                total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+                while total > self.max_bytes:
+                    # Oldest first, a batch at a time
+                    rows = connection.execute('SELECT key, size FROM results ORDER BY accessed LIMIT 16').fetchall()
+                    connection.executemany('DELETE FROM results WHERE key = ?', [(row[0],) for row in rows])
+                    total -= sum(row[1] for row in rows)
+                    with self._lock:
+                        self.evictions += len(rows)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            self._failed('write', e)
+
+    def invalidate(self, scope, fingerprint):
+        # Drop the scope's entries computed from any other fingerprint
+        try:
+            self._connection().execute('DELETE FROM results WHERE scope = ? AND fingerprint != ?',
+                                       (scope, fingerprint))
+        except sqlite3.Error as e:
+            self._failed('invalidation', e)
+
+    def clear(self):
+        try:
+            self._connection().execute('DELETE FROM results')
+        except sqlite3.Error as e:
+            self._failed('clear', e)
+
+    def stats(self):
+        try:
+            entries, size = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        except sqlite3.Error as e:
+            self._failed('stats', e)
+            entries, size = None, None
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
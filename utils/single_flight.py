@@ -0,0 +1,81 @@
+# utils/single_flight.py
+
+import functools
+import threading
+
+from utils.figure_cache import callback_key
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    # Coalesces concurrent calls for the same key: the first caller computes,
+    # callers arriving while it runs wait for it and share its result (or its
+    # exception). Nothing is kept once the computation returns.
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = self.computed = self.merged = self.peak_waiters = 0
+
+    def run(self, key, compute):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.merged += 1
+                self.peak_waiters = max(self.peak_waiters, flight.waiters)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self.computed += 1
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'computed': self.computed,
+                'merged': self.merged,
+                'in_flight': len(self._flights),
+                'peak_waiters': self.peak_waiters,
+                'merge_rate': self.merged / self.calls if self.calls else 0.0,
+            }
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+def coalesce_callback(dates=(), flights=SINGLE_FLIGHT):
+    # Share one computation between concurrent calls of a callback with the
+    # same canonical inputs (see callback_key); `dates` are the positions of
+    # date arguments. Outputs are shared, so they must not be mutated.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            return flights.run(callback_key(func, (), args, dates), lambda: func(*args))
+        return wrapper
+    return decorator
@@ -0,0 +1,126 @@
+# utils/snapshots.py
+
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional, snapshots fall back to pickle
+    pa = None
+    feather = None
+
+# Where converted snapshots live. Every gunicorn worker on a node shares it.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', './snapshots')
+
+# Bump when the on-disk layout changes so stale snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+READERS = {
+    '.xlsx': pd.read_excel,
+    '.xls': pd.read_excel,
+    '.csv': pd.read_csv,
+}
+
+
+def source_fingerprint(path):
+    # Content hash of the source file, so a touched-but-unchanged workbook
+    # keeps its snapshot and an edited one is always re-converted
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot_key(path, read_kwargs):
+    key = hashlib.sha1()
+    key.update(source_fingerprint(path).encode())
+    key.update(repr(sorted(read_kwargs.items())).encode())
+    key.update(str(SNAPSHOT_VERSION).encode())
+    return key.hexdigest()[:16]
+
+
+def _snapshot_stem(path):
+    return os.path.splitext(os.path.basename(path))[0].replace(' ', '_')
+
+
+def write_atomic(target, write):
+    # Write next to the target and rename, so concurrent workers never see a
+    # half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_stale(stem, keep):
+    # Drop the older versions of a cache file in SNAPSHOT_DIR
+    for name in os.listdir(SNAPSHOT_DIR):
+        if name.startswith(stem + '-') and name not in keep:
+            try:
+                os.remove(os.path.join(SNAPSHOT_DIR, name))
+            except OSError:
+                pass
+
+
+def _write_snapshot(df, base):
+    if feather is not None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns (e.g. dates stored partly as text)
+            # have no Arrow equivalent, keep those sources as pickles
+            table = None
+        if table is not None:
+            target = base + '.feather'
+            # Uncompressed so the file can be memory-mapped on read
+            write_atomic(target, lambda p: feather.write_feather(table, p, compression='uncompressed'))
+            return target
+    target = base + '.pkl'
+    write_atomic(target, lambda p: df.to_pickle(p))
+    return target
+
+
+def _read_snapshot(target):
+    if target.endswith('.feather'):
+        return feather.read_table(target, memory_map=True).to_pandas()
+    return pd.read_pickle(target)
+
+
+def read_snapshot(path, reader=None, **read_kwargs):
+    # Load a source file from data/ through its columnar snapshot, converting
+    # it once per content hash instead of re-parsing it on every import
+    if reader is None:
+        reader = READERS[os.path.splitext(path)[1].lower()]
+
+    stem = _snapshot_stem(path)
+    base = os.path.join(SNAPSHOT_DIR, f"{stem}-{_snapshot_key(path, read_kwargs)}")
+    candidates = [base + '.pkl']
+    if feather is not None:
+        candidates.insert(0, base + '.feather')
+
+    for target in candidates:
+        if os.path.exists(target):
+            try:
+                return _read_snapshot(target)
+            except Exception:
+                # Corrupt or unreadable snapshot, rebuild it from the source
+                break
+
+    df = reader(path, **read_kwargs)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        target = _write_snapshot(df, base)
+        remove_stale(stem, {os.path.basename(target)})
+    except OSError as e:
+        print(f"Could not write snapshot for {path}: {e}")
+    return df
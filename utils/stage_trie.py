@@ -0,0 +1,115 @@
+# utils/stage_trie.py
+
+import numpy as np
+import pandas as pd
+
+
+class StageTrie:
+    # Prefix tree over contacts' stage journeys (consecutive repeats already
+    # collapsed). Node 0 is the root; every other node is one journey prefix,
+    # stored as flat arrays (parent, stage, depth) with the number of contacts
+    # passing through it and ending on it. Counts are also kept per partition
+    # (CSR by node) so queries can be restricted to a filter's partitions.
+
+    def __init__(self, contact, stage, stages, partition=None, n_partitions=1):
+        # contact/stage: one entry per journey step, steps of a contact in order
+        contact = np.asarray(contact, dtype=np.int64)
+        stage = np.asarray(stage, dtype=np.int64)
+        self.stages = list(stages)
+        n_stages = max(len(self.stages), 1)
+
+        # Depth of each step within its contact's journey
+        starts = np.ones(len(contact), dtype=bool)
+        starts[1:] = contact[1:] != contact[:-1]
+        depth = np.arange(len(contact)) - np.maximum.accumulate(np.where(starts, np.arange(len(contact)), 0))
+
+        # Build level by level: a node is a distinct (parent node, stage) pair
+        parents, node_stages, depths = [-1], [-1], [0]
+        node_of_step = np.zeros(len(contact), dtype=np.int64)
+        by_depth = np.argsort(depth, kind='stable')
+        bounds = np.searchsorted(depth[by_depth], np.arange(depth.max() + 2)) if len(depth) else [0]
+        for level in range(len(bounds) - 1):
+            steps = by_depth[bounds[level]:bounds[level + 1]]
+            parent = node_of_step[steps - 1] if level else np.zeros(len(steps), dtype=np.int64)
+            keys, inverse = np.unique(parent * n_stages + stage[steps], return_inverse=True)
+            node_of_step[steps] = len(parents) + inverse
+            parents.extend(keys // n_stages)
+            node_stages.extend(keys % n_stages)
+            depths.extend([level + 1] * len(keys))
+
+        self.parent = np.array(parents, dtype=np.int64)
+        self.stage = np.array(node_stages, dtype=np.int64)
+        self.depth = np.array(depths, dtype=np.int64)
+        self._children = {(p, s): node for node, (p, s) in enumerate(zip(self.parent, self.stage)) if node}
+
+        n_nodes = len(self.parent)
+        ends = np.ones(len(contact), dtype=bool)
+        ends[:-1] = contact[1:] != contact[:-1]
+        self.count = np.bincount(node_of_step, minlength=n_nodes)
+        self.count[0] = ends.sum()
+        self.ends = np.bincount(node_of_step[ends], minlength=n_nodes)
+
+        # Per-partition counts, as sorted (node, partition) runs
+        self.n_partitions = n_partitions
+        step_partition = np.zeros(len(contact), dtype=np.int64) if partition is None else np.asarray(partition)[contact]
+        self._through = self._runs(node_of_step, step_partition, n_nodes)
+        self._ending = self._runs(node_of_step[ends], step_partition[ends], n_nodes)
+
+    def _runs(self, node, partition, n_nodes):
+        keys, counts = np.unique(node * self.n_partitions + partition, return_counts=True)
+        pointers = np.searchsorted(keys // self.n_partitions, np.arange(n_nodes + 1))
+        return pointers, keys % self.n_partitions, counts
+
+    def _node_count(self, runs, node, mask):
+        pointers, partitions, counts = runs
+        window = slice(pointers[node], pointers[node + 1])
+        return int(counts[window][mask[partitions[window]]].sum())
+
+    def _counts(self, runs, totals, mask):
+        if mask is None:
+            return totals
+        pointers, partitions, counts = runs
+        node = np.repeat(np.arange(len(pointers) - 1), np.diff(pointers))
+        selected = mask[partitions]
+        return np.bincount(node[selected], weights=counts[selected], minlength=len(totals)).astype(np.int64)
+
+    def node(self, path):
+        # Trie node of a journey prefix (a sequence of stage labels), or None
+        node = 0
+        codes = {label: code for code, label in enumerate(self.stages)}
+        for label in path:
+            node = self._children.get((node, codes.get(label, -1)))
+            if node is None:
+                return None
+        return node
+
+    def path_count(self, path, mask=None):
+        # Contacts whose journey starts with `path`
+        node = self.node(path)
+        if node is None:
+            return 0
+        return int(self.count[node]) if mask is None else self._node_count(self._through, node, mask)
+
+    def funnel(self, path, mask=None):
+        # Contacts remaining after each stage of `path`
+        rows = []
+        for depth in range(1, len(path) + 1):
+            rows.append({'Stage': path[depth - 1], 'Count': self.path_count(path[:depth], mask)})
+        return pd.DataFrame(rows, columns=['Stage', 'Count'])
+
+    def journey(self, node):
+        labels = []
+        while node > 0:
+            labels.append(self.stages[self.stage[node]])
+            node = self.parent[node]
+        return labels[::-1]
+
+    def top_journeys(self, n=10, mask=None):
+        # Most common complete journeys
+        ends = self._counts(self._ending, self.ends, mask)
+        nodes = np.flatnonzero(ends)
+        nodes = nodes[np.lexsort((self.depth[nodes], -ends[nodes]))][:n]
+        return pd.DataFrame({
+            'Journey': [' → '.join(self.journey(node)) for node in nodes],
+            'Count': ends[nodes],
+        }, columns=['Journey', 'Count'])
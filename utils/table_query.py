@@ -0,0 +1,126 @@
+# utils/table_query.py
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# One term of a DataTable filter_query, e.g. "{Budget From} >= 100000" or
+# "{Lead Status} scontains Prospect"; terms are joined with " && "
+FILTER_TERM = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s+(?P<case>[si](?=\S))?(?P<op>>=|<=|!=|=|<|>|eq|ne|lt|le|gt|ge|contains|datestartswith)'
+    r'\s+(?P<value>.*?)\s*$')
+
+OPERATORS = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+TEXT_OPERATORS = ('contains', 'datestartswith')
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1]
+    return value
+
+
+def _literal(value):
+    unquoted = _unquote(value)
+    if unquoted != value:
+        return unquoted
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_filter_query(query):
+    # (column, operator, value, case sensitive) per recognised term; terms the
+    # table cannot send in this dashboard are ignored rather than failing
+    terms = []
+    for part in (query or '').split(' && '):
+        match = FILTER_TERM.match(part)
+        if match:
+            op = OPERATORS.get(match.group('op'), match.group('op'))
+            # Text operators match the token as typed: 2023 stays "2023"
+            value = _unquote(match.group('value')) if op in TEXT_OPERATORS else _literal(match.group('value'))
+            terms.append((match.group('column'), op, value, match.group('case') != 'i'))
+    return terms
+
+
+def _as_text(column):
+    # Values as the browser shows them: ISO timestamps with a "T", and whole
+    # floats without a trailing ".0", as JavaScript prints them
+    if pd.api.types.is_datetime64_any_dtype(column):
+        text = column.dt.strftime('%Y-%m-%dT%H:%M:%S').copy()
+        fraction = (column.dt.microsecond != 0).to_numpy()
+        if fraction.any():
+            text = text.mask(fraction, column.dt.strftime('%Y-%m-%dT%H:%M:%S.%f'))
+    elif pd.api.types.is_float_dtype(column):
+        values = column.to_numpy()
+        whole = np.isfinite(values) & (values % 1 == 0)
+        text = pd.Series(np.where(whole, np.char.mod('%.0f', np.where(whole, values, 0)), values.astype(str)),
+                         index=column.index)
+    else:
+        text = column.astype(str)
+    return text.where(column.notna(), None)
+
+
+def _compare(column, op, value, case):
+    if op in TEXT_OPERATORS:
+        text = _as_text(column)
+        if op == 'datestartswith':
+            return text.str.startswith(value.replace(' ', 'T'), na=False).to_numpy(dtype=bool)
+        return text.str.contains(value, case=case, regex=False, na=False).to_numpy(dtype=bool)
+
+    if pd.api.types.is_datetime64_any_dtype(column):
+        try:
+            value = pd.Timestamp(str(value))
+        except ValueError:
+            return np.zeros(len(column), dtype=bool)
+    elif pd.api.types.is_numeric_dtype(column):
+        if isinstance(value, str):
+            return np.zeros(len(column), dtype=bool)
+    else:
+        # Text columns compare as text (mixed object columns included)
+        present = column.notna().to_numpy()
+        value = str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+        column = column.astype(str)
+        if not case:
+            column, value = column.str.lower(), value.lower()
+        return _apply(op, column, value) & present
+    return _apply(op, column, value)
+
+
+def _apply(op, column, value):
+    result = {'=': column == value, '!=': column != value, '<': column < value, '<=': column <= value,
+              '>': column > value, '>=': column >= value}[op]
+    return np.asarray(result, dtype=bool)
+
+
+def filter_view(view, terms, index=None):
+    # Narrow a FrameView by parsed filter terms. Case-sensitive equality on a
+    # column of `index` (a BitmapIndex over the view's base frame) is a bitset
+    # probe; everything else compares only the one column it names. A term
+    # that cannot be evaluated matches no rows rather than failing.
+    for column, op, value, case in terms:
+        if column not in view.base.columns or not len(view):
+            continue
+        if index is not None and op == '=' and case and column in index.bitmaps and isinstance(value, str):
+            positions = np.arange(len(view.base)) if view.positions is None else view.positions
+            view = view.where(index.test(index.match(column, [value]), positions))
+        else:
+            try:
+                view = view.where(_compare(view.column(column), op, value, case))
+            except (TypeError, ValueError):
+                view = view.take(np.zeros(0, dtype=np.int64))
+    return view
+
+
+def sort_view(view, sort_by):
+    # Stable multi-column sort of a FrameView by DataTable sort_by entries;
+    # missing values last, as in the browser-side sort
+    columns = [entry['column_id'] for entry in sort_by or [] if entry['column_id'] in view.base.columns]
+    if not columns or not len(view):
+        return view
+    ascending = [entry['direction'] == 'asc' for entry in sort_by if entry['column_id'] in view.base.columns]
+    frame = view.frame(columns).reset_index(drop=True)
+    order = frame.sort_values(columns, ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    return view.take(order)
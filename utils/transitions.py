@@ -0,0 +1,196 @@
+# utils/transitions.py
+
+import numpy as np
+import pandas as pd
+
+from utils.stage_trie import StageTrie
+
+
+def map_action_to_stage(action_type):
+    if 'Lead Ticket Was Created' in action_type:
+        return 'Lead Created'
+    elif 'Lead Ticket Was Assigned to Branch' in action_type:
+        return 'Assigned to Branch'
+    elif 'Lead Ticket Was Assigned to Agent' in action_type:
+        return 'Assigned to Agent'
+    elif 'Lead Ticket Was Converted to Request' in action_type:
+        return 'Converted to Request'
+    elif 'Request Was Created' in action_type:
+        return 'Request Created'
+    elif 'Lead Ticket Was Converted to Prospect' in action_type:
+        return 'Converted to Prospect'
+    elif 'Prospect Was Created' in action_type:
+        return 'Prospect Created'
+    elif any(x in action_type for x in ['Was Set Unqualified', 'Status Changed to Unqualified']):
+        return 'Closed - Unqualified'
+    elif 'Was Voided' in action_type:
+        return 'Closed - Voided'
+    elif 'Was Rejected' in action_type:
+        return 'Closed - Rejected'
+    elif 'Call Was Created' in action_type:
+        return 'Call Created'
+    elif 'Call Was Assigned to Branch' in action_type:
+        return 'Call Assigned to Branch'
+    elif 'Call Was Assigned to Agent' in action_type:
+        return 'Call Assigned to Agent'
+    else:
+        return 'Other'
+
+
+def _ranked(labels, counts, columns):
+    # Non-zero counts, largest first; ties keep code order
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    return pd.DataFrame({columns[0]: np.asarray(labels, dtype=object)[order], columns[1]: counts[order]})
+
+
+def _sparse(partition, code, n_codes):
+    # Non-zero counts as (partition, code, count) rows
+    keys, counts = np.unique(partition * n_codes + code, return_counts=True)
+    return keys // n_codes, keys % n_codes, counts
+
+
+def _total(rows, mask, n_codes):
+    # Counts per code summed over the partitions selected by `mask`
+    partition, code, count = rows
+    selected = mask[partition]
+    return np.bincount(code[selected], weights=count[selected], minlength=n_codes).astype(np.int64)
+
+
+def _count_events(contact, action_type, n_contacts, partition):
+    # Integer-coded pass over the action events. `contact` is each event's
+    # contact position (events of a contact in order) and `partition` each
+    # contact's partition; counts come out as sparse rows per partition.
+    contact = np.asarray(contact, dtype=np.int64)
+    action_type = np.asarray(action_type, dtype=object)
+    if len(contact) and (np.diff(contact) < 0).any():
+        order = np.argsort(contact, kind='stable')
+        contact, action_type = contact[order], action_type[order]
+    partition = np.asarray(partition, dtype=np.int64)
+
+    action_codes, actions = pd.factorize(action_type)
+    stage_of_action, stages = pd.factorize(np.array([map_action_to_stage(a) for a in actions], dtype=object))
+    stage = stage_of_action[action_codes]
+    n_stages, n_actions = len(stages), len(actions)
+
+    # Consecutive duplicate stages of a contact collapse into one step
+    starts = np.ones(len(contact), dtype=bool)
+    starts[1:] = contact[1:] != contact[:-1]
+    keep = starts.copy()
+    keep[1:] |= stage[1:] != stage[:-1]
+    step_contact, step_stage = contact[keep], stage[keep]
+
+    # (source, target) pairs are neighbouring steps of the same contact
+    same_contact = step_contact[1:] == step_contact[:-1]
+    source, target = step_stage[:-1][same_contact], step_stage[1:][same_contact]
+    pair_partition = partition[step_contact[1:][same_contact]]
+    transitions = _sparse(pair_partition, source * n_stages + target, n_stages * n_stages)
+
+    # Last stage of each contact; contacts without actions are 'Unknown'
+    final_stage = np.full(n_contacts, n_stages, dtype=np.int64)
+    ends = np.ones(len(contact), dtype=bool)
+    ends[:-1] = contact[1:] != contact[:-1]
+    final_stage[contact[ends]] = stage[ends]
+    finals = _sparse(partition, final_stage, n_stages + 1)
+
+    action_counts = _sparse(partition[contact], action_codes, n_actions)
+
+    return {
+        'stages': list(stages),
+        'actions': list(actions),
+        'transitions': transitions,
+        'finals': finals,
+        'action_counts': action_counts,
+        'step_contact': step_contact,
+        'step_stage': step_stage,
+    }
+
+
+def _summarize(stages, actions, matrix, finals, action_counts):
+    # Chart-ready frames from (summed) count arrays
+    sources, targets = np.nonzero(matrix)
+    order = np.argsort(-matrix[sources, targets], kind='stable')
+    return {
+        'stages': stages,
+        'matrix': matrix,
+        'transition_counts': pd.DataFrame({
+            'source': np.asarray(stages, dtype=object)[sources[order]],
+            'target': np.asarray(stages, dtype=object)[targets[order]],
+            'count': matrix[sources, targets][order],
+        }),
+        'stage_counts': _ranked(list(stages) + ['Unknown'], finals, ['Stage', 'Count']),
+        'action_counts': _ranked(actions, action_counts, ['Action', 'Count']),
+    }
+
+
+DAY = pd.Timedelta(days=1).value
+
+
+class TransitionStore:
+    # Transition, final-stage and action counts (plus counts of one per-contact
+    # value, for histograms) precomputed per (day, branch, agent) partition.
+    # Only non-zero counts are kept, one (partition, code, count) row each, so
+    # the store never outgrows the events it was built from. A filter query
+    # is one bincount over the rows of the partitions it selects.
+
+    def __init__(self, contact, action_type, dates, branches, agents, values=None):
+        # dates: per-contact creation timestamps; branches/agents: per-contact
+        # names (missing -> 'Unassigned'); values: optional per-contact values
+        dates = pd.DatetimeIndex(dates).as_unit('ns')
+        day = np.where(dates.isna(), -1, dates.asi8 // DAY)
+        keys = pd.MultiIndex.from_arrays([
+            day,
+            pd.Series(branches, dtype=object).fillna('Unassigned').to_numpy(),
+            pd.Series(agents, dtype=object).fillna('Unassigned').to_numpy(),
+        ])
+        partition, self.partitions = keys.factorize()
+        n_partitions = len(self.partitions)
+
+        counts = _count_events(contact, action_type, len(partition), partition)
+        self.stages = counts['stages']
+        self.actions = counts['actions']
+        self.transitions = counts['transitions']
+        self.finals = counts['finals']
+        self.action_counts = counts['action_counts']
+        self.trie = StageTrie(counts['step_contact'], counts['step_stage'], self.stages, partition, n_partitions)
+
+        if values is not None:
+            value_codes, self.values = pd.factorize(np.asarray(values))
+            self.value_counts = _sparse(partition, value_codes, len(self.values))
+        else:
+            self.values, self.value_counts = None, None
+
+        self._day = self.partitions.get_level_values(0).to_numpy()
+        self._branch = self.partitions.get_level_values(1).to_numpy()
+        self._agent = self.partitions.get_level_values(2).to_numpy()
+
+    def branches(self):
+        return sorted(set(self._branch))
+
+    def agents(self):
+        return sorted(set(self._agent))
+
+    def select(self, start_date=None, end_date=None, branches=None, agents=None):
+        # Partitions matching the filters; dates are matched by day, and the
+        # end day is included
+        mask = np.ones(len(self.partitions), dtype=bool)
+        if start_date:
+            mask &= self._day >= pd.Timestamp(start_date).value // DAY
+        if end_date:
+            mask &= (self._day >= 0) & (self._day <= pd.Timestamp(end_date).value // DAY)
+        if branches:
+            mask &= np.isin(self._branch, list(branches))
+        if agents:
+            mask &= np.isin(self._agent, list(agents))
+        return mask
+
+    def query(self, start_date=None, end_date=None, branches=None, agents=None):
+        mask = self.select(start_date, end_date, branches, agents)
+        n_stages = len(self.stages)
+        matrix = _total(self.transitions, mask, n_stages * n_stages).reshape(n_stages, n_stages)
+        summary = _summarize(self.stages, self.actions, matrix, _total(self.finals, mask, n_stages + 1),
+                             _total(self.action_counts, mask, len(self.actions)))
+        if self.value_counts is not None:
+            counts = _total(self.value_counts, mask, len(self.values))
+            summary['value_counts'] = pd.DataFrame({'value': self.values[counts > 0], 'count': counts[counts > 0]})
+        return summary
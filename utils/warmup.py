@@ -0,0 +1,190 @@
+# utils/warmup.py
+
+import atexit
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from dash.exceptions import PreventUpdate
+
+from utils.figure_cache import callback_scope, canonical_args
+from utils.snapshots import SNAPSHOT_DIR
+
+# SQLite file counting the inputs callbacks are called with; empty disables it
+ACCESS_LOG_PATH = os.environ.get('ACCESS_LOG_PATH', os.path.join(SNAPSHOT_DIR, 'access_log.sqlite'))
+# Seconds between writes of the buffered counts to the access log
+ACCESS_LOG_FLUSH = float(os.environ.get('ACCESS_LOG_FLUSH', 30))
+# Most frequent logged states warmed up besides each callback's default state
+WARMUP_TOP_N = int(os.environ.get('WARMUP_TOP_N', 20))
+# Wall-clock seconds warm-up may run for, and the quiet time it waits for
+# after the last live request before computing each state
+WARMUP_BUDGET = float(os.environ.get('WARMUP_BUDGET', 120))
+WARMUP_IDLE = float(os.environ.get('WARMUP_IDLE', 0.5))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS inputs (
+    scope TEXT NOT NULL,
+    args TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    last REAL NOT NULL,
+    PRIMARY KEY (scope, args)
+);
+"""
+
+
+class AccessLog:
+    # How often each callback ran with each canonical input state, shared by
+    # the node's workers and kept across restarts. Calls are counted in memory
+    # and added to the file at most every ACCESS_LOG_FLUSH seconds.
+
+    def __init__(self, path, flush_interval=ACCESS_LOG_FLUSH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def record(self, scope, args):
+        with self._lock:
+            self._pending[scope, args] += 1
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        now = time.time()
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT INTO inputs VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (scope, args) DO UPDATE SET hits = hits + excluded.hits, last = excluded.last',
+                    [(scope, args, hits, now) for (scope, args), hits in pending.items()])
+            connection.close()
+        except sqlite3.Error as e:
+            print(f"Access log write failed: {e}")
+
+    def top(self, scopes, n):
+        # The n most frequent (scope, args) of the given callbacks
+        if not scopes or n <= 0:
+            return []
+        try:
+            connection = self._connect()
+            rows = connection.execute(
+                f"SELECT scope, args FROM inputs WHERE scope IN ({', '.join('?' * len(scopes))}) "
+                'ORDER BY hits DESC, last DESC LIMIT ?', (*scopes, n)).fetchall()
+            connection.close()
+        except sqlite3.Error as e:
+            print(f"Access log read failed: {e}")
+            return []
+        return [(scope, json.loads(args)) for scope, args in rows]
+
+
+ACCESS_LOG = AccessLog(ACCESS_LOG_PATH) if ACCESS_LOG_PATH else None
+if ACCESS_LOG is not None:
+    atexit.register(ACCESS_LOG.flush)
+
+# scope -> (callback without logging, default state or None)
+_callbacks = {}
+_live = 0
+_last_live = 0.0
+_live_lock = threading.Lock()
+
+
+def request_started():
+    global _live
+    with _live_lock:
+        _live += 1
+
+
+def request_finished():
+    global _live, _last_live
+    with _live_lock:
+        _live -= 1
+        _last_live = time.monotonic()
+
+
+def _wait_for_idle(deadline):
+    # Warm-up only computes while no live request is running or just ended
+    while time.monotonic() < deadline:
+        with _live_lock:
+            idle = _live <= 0 and time.monotonic() - _last_live >= WARMUP_IDLE
+        if idle:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def warm_callback(default=None, dates=()):
+    # Log the canonical inputs of a callback's completed calls in the access
+    # log, and register it for warm-up. `default` returns the inputs of the
+    # page's initial state; `dates` are the positions of date arguments.
+    def decorator(func):
+        scope = callback_scope(func)
+        _callbacks[scope] = (func, default, dates)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            result = func(*args)
+            if ACCESS_LOG is not None:
+                ACCESS_LOG.record(scope, json.dumps(canonical_args(args, dates), default=str))
+            return result
+        return wrapper
+    return decorator
+
+
+def warmup_states(top_n=WARMUP_TOP_N):
+    # Each callback's default state, then the most frequent logged ones
+    states = []
+    for scope, (func, default, dates) in _callbacks.items():
+        if default is not None:
+            try:
+                states.append((scope, json.loads(json.dumps(canonical_args(default(), dates), default=str))))
+            except Exception as e:
+                print(f"Failed to build the default state of {scope}: {e}")
+    if ACCESS_LOG is not None:
+        ACCESS_LOG.flush()
+        states.extend(ACCESS_LOG.top(list(_callbacks), top_n))
+
+    unique, seen = [], set()
+    for scope, args in states:
+        key = (scope, json.dumps(args))
+        if key not in seen:
+            seen.add(key)
+            unique.append((scope, args))
+    return unique
+
+
+def warm_up_callbacks(budget=WARMUP_BUDGET, top_n=WARMUP_TOP_N):
+    # Compute the warm-up states through the callbacks' own caches, one at a
+    # time and only between live requests, until the budget runs out
+    deadline = time.monotonic() + budget
+    warmed = 0
+    for scope, args in warmup_states(top_n):
+        if not _wait_for_idle(deadline):
+            break
+        try:
+            _callbacks[scope][0](*args)
+            warmed += 1
+        except PreventUpdate:
+            pass
+        except Exception as e:
+            print(f"Failed to warm up {scope}: {e}")
+    return warmed